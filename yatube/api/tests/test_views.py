@@ -0,0 +1,159 @@
+import csv
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedAPITests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title="Test-title",
+            description="Test_description",
+            slug="test-slug",
+        )
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        for i in range(12):
+            Post.objects.create(
+                text=f"Тестовый текст_{i}", author=cls.author, group=cls.group
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feeds_return_json_pages(self):
+        urls = [
+            reverse("api:posts"),
+            reverse("api:group", kwargs={"slug": self.group.slug}),
+            reverse("api:profile", kwargs={"username": self.author}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(len(data["results"]), 10)
+                first = data["results"][0]
+                self.assertEqual(first["text"], "Тестовый текст_11")
+                self.assertEqual(first["author"], "author")
+                self.assertIsNone(data["previous"])
+                data = self.guest_client.get(data["next"]).json()
+                self.assertEqual(len(data["results"]), 2)
+                self.assertIsNone(data["next"])
+
+    def test_follow_feed(self):
+        response = self.guest_client.get(reverse("api:follow"))
+        self.assertEqual(response.status_code, 401)
+        response = self.authorized_client.get(reverse("api:follow"))
+        self.assertEqual(len(response.json()["results"]), 10)
+        self.assertIn("Cookie", response["Vary"])
+
+    def test_conditional_get(self):
+        url = reverse("api:posts")
+        response = self.guest_client.get(url)
+        etag = response["ETag"]
+        self.assertFalse(response.has_header("Last-Modified"))
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text="Новый пост", author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["text"], "Новый пост")
+
+    def test_edit_and_follow_change_etag(self):
+        url = reverse("api:follow")
+        etag = self.authorized_client.get(url)["ETag"]
+        post = Post.objects.filter(author=self.author).first()
+        post.text = "Исправленный текст"
+        post.save()
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        # Подписка на другого автора вместо прежнего: число то же.
+        other = User.objects.create_user(username="other")
+        Follow.objects.filter(user=self.reader).delete()
+        Follow.objects.create(user=self.reader, author=other)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ExportAPITests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title="Test-title",
+            description="Test_description",
+            slug="test-slug",
+        )
+        cls.author = User.objects.create_user(username="author")
+        cls.posts = [
+            Post.objects.create(
+                text=f"Тестовый текст_{i}", author=cls.author, group=cls.group
+            )
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text="Комментарий"
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.url = reverse(
+            "api:profile_export", kwargs={"username": "author"}
+        )
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_ndjson(self):
+        response = self.guest_client.get(self.url)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertIn("author.ndjson", response["Content-Disposition"])
+        records = [
+            json.loads(line)
+            for line in self.content(response).decode().splitlines()
+        ]
+        self.assertEqual(
+            [record["id"] for record in records],
+            [post.pk for post in self.posts],
+        )
+        self.assertEqual(records[0]["group"], "test-slug")
+        self.assertEqual(records[0]["comments"][0]["text"], "Комментарий")
+        self.assertEqual(records[1]["comments"], [])
+
+    def test_csv(self):
+        url = reverse("api:group_export", kwargs={"slug": "test-slug"})
+        response = self.guest_client.get(url, {"format": "csv"})
+        rows = list(csv.DictReader(
+            self.content(response).decode().splitlines()
+        ))
+        self.assertEqual(
+            [row["type"] for row in rows],
+            ["post", "comment", "post", "post"],
+        )
+        self.assertEqual(rows[1]["post_id"], str(self.posts[0].pk))
+
+    def test_gzip(self):
+        response = self.guest_client.get(
+            self.url, HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(self.content(response)).splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_errors(self):
+        response = self.guest_client.get(self.url, {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+        url = reverse("api:profile_export", kwargs={"username": "nobody"})
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
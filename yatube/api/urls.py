@@ -0,0 +1,23 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", views.posts, name="posts"),
+    path("group/<slug:slug>/", views.group_posts, name="group"),
+    path(
+        "group/<slug:slug>/export/",
+        views.group_export,
+        name="group_export",
+    ),
+    path("follow/", views.follow, name="follow"),
+    path(
+        "<str:username>/export/",
+        views.profile_export,
+        name="profile_export",
+    ),
+    path("<str:username>/", views.profile, name="profile"),
+]
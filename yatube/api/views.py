@@ -0,0 +1,157 @@
+import hashlib
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
+
+from posts import export
+from posts.cache import feed_version, following_ids
+from posts.models import Group, Post, User
+from posts.paginators import KeysetPaginator
+from posts.timeline import latest_pub_date, timeline_paginator
+
+
+def serialize_post(post):
+    image = post.image.url if post.image else None
+    return {
+        "id": post.pk,
+        "text": post.text,
+        "pub_date": post.pub_date.isoformat(),
+        "author": post.author.username,
+        "group": post.group.slug if post.group else None,
+        "comment_count": post.comment_count,
+        "image": post.thumbnail_url or image,
+    }
+
+
+class PostFeed:
+    """Лента постов из QuerySet, который строит get_queryset."""
+
+    def __init__(self, get_queryset):
+        self.get_queryset = get_queryset
+
+    def latest(self, request, **kwargs):
+        return self.get_queryset(request, **kwargs).order_by(
+            "-pub_date"
+        ).values_list("pub_date", flat=True).first()
+
+    def paginator(self, request, **kwargs):
+        return KeysetPaginator(
+            self.get_queryset(request, **kwargs).feed(),
+            settings.PAGES_OBG_AMT,
+        )
+
+
+class FollowFeed:
+    """Лента подписок: разосланные записи плюс популярные авторы."""
+
+    def latest(self, request):
+        return latest_pub_date(request.user)
+
+    def paginator(self, request):
+        return timeline_paginator(request.user, settings.PAGES_OBG_AMT)
+
+
+def feed_endpoint(feed, personal=False):
+    """JSON-лента с курсорной пагинацией и условными GET-запросами.
+
+    ETag учитывает дату самого нового поста, версию ленты (она меняется
+    при правке постов и комментариев), параметры страницы и, для личных
+    лент, пользователя и его подписки. Last-Modified не отдаем: дата
+    поста не меняется при правке и новых комментариях, и проверка по
+    If-Modified-Since отдавала бы устаревшую ленту.
+    """
+
+    def etag(request, **kwargs):
+        latest = feed.latest(request, **kwargs)
+        parts = [
+            latest.isoformat() if latest else "",
+            str(feed_version()),
+            request.GET.urlencode(),
+        ]
+        if personal:
+            parts.append(str(request.user.pk))
+            parts += [str(pk) for pk in sorted(following_ids(request))]
+        return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    @condition(etag_func=etag)
+    def view(request, **kwargs):
+        paginator = feed.paginator(request, **kwargs)
+        page = paginator.get_page(request.GET)
+        return JsonResponse({
+            "results": [serialize_post(post) for post in page],
+            "next": (
+                f"{request.path}?{paginator.next_query}"
+                if page.has_next() else None
+            ),
+            "previous": (
+                f"{request.path}?{paginator.previous_query}"
+                if page.has_previous() else None
+            ),
+        })
+
+    @require_GET
+    def endpoint(request, **kwargs):
+        if personal and not request.user.is_authenticated:
+            return JsonResponse(
+                {"detail": "Требуется авторизация"}, status=401
+            )
+        response = view(request, **kwargs)
+        if personal:
+            patch_vary_headers(response, ("Cookie",))
+        return response
+
+    return endpoint
+
+
+def _all_posts(request):
+    return Post.objects.all()
+
+
+def _group_posts(request, slug):
+    return get_object_or_404(Group, slug=slug).group_posts.all()
+
+
+def _profile_posts(request, username):
+    return get_object_or_404(User, username=username).author_posts.all()
+
+
+posts = feed_endpoint(PostFeed(_all_posts))
+group_posts = feed_endpoint(PostFeed(_group_posts))
+profile = feed_endpoint(PostFeed(_profile_posts))
+follow = feed_endpoint(FollowFeed(), personal=True)
+
+
+def export_endpoint(get_queryset):
+    """Потоковая выгрузка постов с комментариями: ?format=ndjson|csv.
+
+    Сжимается gzip на лету, если клиент его принимает.
+    """
+
+    @require_GET
+    @gzip_page
+    def endpoint(request, **kwargs):
+        export_format = request.GET.get("format", "ndjson")
+        if export_format not in export.FORMATS:
+            return JsonResponse(
+                {"detail": "Формат должен быть ndjson или csv"}, status=400
+            )
+        queryset = get_queryset(request, **kwargs)
+        name = "-".join(kwargs.values()) or "posts"
+        response = StreamingHttpResponse(
+            export.buffered(export.export_lines(queryset, export_format)),
+            content_type=export.FORMATS[export_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{name}.{export_format}"'
+        )
+        return response
+
+    return endpoint
+
+
+group_export = export_endpoint(_group_posts)
+profile_export = export_endpoint(_profile_posts)
@@ -0,0 +1,123 @@
+"""Замеры задержки и числа SQL-запросов страниц ленты через тестовый
+клиент Django."""
+import math
+import random
+import statistics
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Comment, Follow, Group, Post, User
+
+VIEWS = (
+    "index", "group_posts", "profile", "post_view", "follow_index",
+    "trending",
+)
+
+
+def percentile(values, share):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(share * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+def summary(durations, queries):
+    return {
+        "requests": len(durations),
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 2),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.mean(durations) * 1000, 2),
+        "max_ms": round(max(durations) * 1000, 2),
+        "queries_mean": round(statistics.mean(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+class Benchmark:
+    """Запрашивает каждую страницу iterations раз.
+
+    Авторы, группы, посты и читатели ленты подписок выбираются
+    случайно, но воспроизводимо при одном random_seed. Без warm кеш
+    сбрасывается перед каждым запросом, чтобы мерить работу с базой.
+    """
+
+    def __init__(self, iterations=100, warm=False, random_seed=0):
+        self.iterations = iterations
+        self.warm = warm
+        self.rng = random.Random(random_seed)
+        self.client = Client()
+        # Популярные авторы, у которых есть посты.
+        self.authors = list(User.objects.filter(
+            stats__posts_count__gt=0
+        ).order_by("-stats__followers_count").values_list(
+            "username", flat=True
+        )[:1000])
+        self.groups = list(Group.objects.values_list("slug", flat=True)[:1000])
+        self.readers = list(User.objects.filter(
+            pk__in=Follow.objects.values("user_id")
+        ).values_list("pk", flat=True)[:1000])
+
+    def urls(self, view):
+        if view in ("index", "trending"):
+            return reverse(view), None
+        if view == "group_posts":
+            slug = self.rng.choice(self.groups)
+            return reverse("group", args=[slug]), None
+        if view == "profile":
+            username = self.rng.choice(self.authors)
+            return reverse("profile", args=[username]), None
+        if view == "post_view":
+            username = self.rng.choice(self.authors)
+            post_id = Post.objects.filter(
+                author__username=username
+            ).values_list("pk", flat=True).first()
+            return reverse("post", args=[username, post_id]), None
+        return reverse("follow_index"), self.rng.choice(self.readers)
+
+    def available(self, view):
+        if view == "group_posts":
+            return bool(self.groups)
+        if view == "follow_index":
+            return bool(self.readers)
+        return bool(self.authors)
+
+    def measure(self, view):
+        durations, queries = [], []
+        for _ in range(self.iterations):
+            url, reader = self.urls(view)
+            if not self.warm:
+                cache.clear()
+            if reader is None:
+                self.client.logout()
+            else:
+                self.client.force_login(User.objects.get(pk=reader))
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = self.client.get(url)
+                durations.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url}: ответ {response.status_code}")
+            queries.append(len(context.captured_queries))
+        return summary(durations, queries)
+
+    def run(self, views=VIEWS):
+        return {
+            view: self.measure(view)
+            for view in views
+            if self.available(view)
+        }
+
+
+def dataset():
+    return {
+        "users": User.objects.count(),
+        "groups": Group.objects.count(),
+        "posts": Post.objects.count(),
+        "comments": Comment.objects.count(),
+        "follows": Follow.objects.count(),
+    }
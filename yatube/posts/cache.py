@@ -0,0 +1,172 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from yatube.metrics import record_cache
+
+from .models import FeedVersion, Follow
+from .paginators import cursor_params
+
+FEED_VERSION_KEY = "feed_version"
+# Сколько секунд процесс верит своей копии версии ленты: запись
+# в другом процессе он заметит не позже.
+FEED_VERSION_TIMEOUT = 5
+FOLLOWING_TIMEOUT = 60 * 10
+COMMENTS_TIMEOUT = 60 * 10
+POST_ITEM_TIMEOUT = 60 * 60
+
+
+def _version(key):
+    # Начальное значение берем из времени, чтобы после вытеснения
+    # ключа версии не поднять старые записи с совпавшим номером.
+    cache.add(key, int(time.time() * 1000), None)
+    return cache.get(key)
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        _version(key)
+
+
+def feed_version():
+    """Текущая версия ленты; входит в ключи всех кешей ленты и в ETag.
+
+    Хранится в базе: кеш у каждого процесса свой, и версия, поднятая
+    в одном процессе, в другом не менялась бы вовсе.
+    """
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        version = FeedVersion.objects.values_list(
+            "version", flat=True
+        ).first() or 0
+        cache.set(FEED_VERSION_KEY, version, FEED_VERSION_TIMEOUT)
+    return version
+
+
+def _forget_feed_version():
+    cache.delete(FEED_VERSION_KEY)
+
+
+def bump_feed_version():
+    """Сбрасывает все закешированные страницы и фрагменты ленты."""
+    # Номер не меньше текущего времени: после отката транзакции или
+    # восстановления базы старые номера не повторятся.
+    now = int(time.time() * 1000)
+    bumped = FeedVersion.objects.filter(pk=1).update(
+        version=Greatest(F("version") + 1, now)
+    )
+    if not bumped:
+        FeedVersion.objects.get_or_create(pk=1, defaults={"version": now})
+    # До коммита другие запросы видят старую версию и могут снова
+    # положить ее в кеш.
+    _forget_feed_version()
+    transaction.on_commit(_forget_feed_version)
+
+
+def author_version_key(author_id):
+    return f"author_version:{author_id}"
+
+
+def author_versions(author_ids):
+    """Версии данных авторов одним обращением к кешу."""
+    keys = {author_version_key(pk): pk for pk in author_ids}
+    versions = {
+        keys[key]: version
+        for key, version in cache.get_many(list(keys)).items()
+    }
+    for key, pk in keys.items():
+        if pk not in versions:
+            versions[pk] = _version(key)
+    return versions
+
+
+def bump_author_version(*author_ids):
+    """Сбрасывает кеши, зависящие от постов и подписок авторов."""
+    for pk in author_ids:
+        _bump(author_version_key(pk))
+
+
+def feed_variant(user):
+    # Карточка поста показывает автору кнопку редактирования,
+    # поэтому вариант для вошедшего пользователя свой у каждого.
+    if user.is_authenticated:
+        return f"user:{user.pk}"
+    return "anonymous"
+
+
+def feed_cursor(request):
+    """Параметры страницы ленты: остальные параметры запроса (utm-метки
+    и т.п.) не должны плодить копии страницы в кеше."""
+    return cursor_params(request.GET).urlencode()
+
+
+def feed_cache_context(request):
+    return {
+        "feed_version": feed_version(),
+        "feed_variant": feed_variant(request.user),
+        "feed_cursor": feed_cursor(request),
+        "feed_timeout": cache.default_timeout,
+    }
+
+
+def following_key(user_id):
+    return f"following:{user_id}"
+
+
+def following_ids(request):
+    """id авторов, на которых подписан текущий пользователь.
+
+    Множество читается из кеша или базы один раз за запрос; проверка
+    подписки на любого автора после этого идет в памяти.
+    """
+    if not hasattr(request, "_following_ids"):
+        ids = frozenset()
+        if request.user.is_authenticated:
+            key = following_key(request.user.pk)
+            ids = cache.get(key)
+            record_cache(ids is not None)
+            if ids is None:
+                ids = frozenset(Follow.objects.filter(
+                    user_id=request.user.pk
+                ).values_list("author_id", flat=True))
+                cache.set(key, ids, FOLLOWING_TIMEOUT)
+        request._following_ids = ids
+    return request._following_ids
+
+
+def invalidate_following(user_id):
+    cache.delete(following_key(user_id))
+
+
+def comments_key(post_id):
+    """Ключ первой страницы комментариев поста."""
+    return f"comments:{post_id}"
+
+
+def invalidate_comments(post_id):
+    cache.delete(comments_key(post_id))
+
+
+def post_version(post):
+    """Отпечаток полей поста, которые видны в его карточке.
+
+    Меняется при правке поста, готовых миниатюрах и новых комментариях,
+    поэтому ключ с ним не нужно сбрасывать отдельно.
+    """
+    fields = (
+        post.text, post.text_html, post.image.name or "", post.thumbnail_url,
+        post.thumbnail_srcset, post.comment_count, post.pub_date.isoformat(),
+        post.author.username, post.group.title if post.group else "",
+    )
+    raw = "|".join(str(field) for field in fields)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def post_item_key(post, is_author):
+    return f"post_item:{post.pk}:{post_version(post)}:{int(is_author)}"
@@ -0,0 +1,86 @@
+"""Данные карточки автора (includes/author_card.html).
+
+Общая часть карточки кешируется по id автора и версии его данных,
+которую сбрасывают сигналы постов, подписок и профиля. Подписан ли
+на автора текущий пользователь, берется из following_ids.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from yatube.metrics import record_cache
+
+from .cache import author_versions, following_ids
+from .counters import rebuild_user_stats
+from .models import User, UserStats
+
+CARD_TIMEOUT = 60 * 10
+
+
+def _card_key(author_id, version):
+    return f"author_card:{author_id}:{version}"
+
+
+def _load_cards(author_ids):
+    """Карточки авторов одним запросом."""
+    stats = UserStats.objects.select_related("user").filter(
+        user_id__in=author_ids
+    )
+    rows = list(stats)
+    if len(rows) < len(author_ids):
+        # У кого-то еще нет строки счетчиков: создаем и читаем заново
+        # из основной базы — реплика могла еще не получить новые строки.
+        rebuild_user_stats(User.objects.filter(pk__in=author_ids))
+        rows = list(stats.using(DEFAULT_DB_ALIAS))
+    return {
+        row.user_id: {
+            "author": row.user,
+            "post_amt": row.posts_count,
+            "follower_amt": row.followers_count,
+            "following_amt": row.following_count,
+        }
+        for row in rows
+    }
+
+
+def author_cards(request, author_ids):
+    """Словари контекста карточек по id автора.
+
+    Из кеша — без запросов к базе; промахи читаются одним запросом.
+    """
+    author_ids = list(dict.fromkeys(author_ids))
+    versions = author_versions(author_ids)
+    keys = {_card_key(pk, versions[pk]): pk for pk in author_ids}
+    cached = cache.get_many(list(keys))
+    cards = {keys[key]: card for key, card in cached.items()}
+    missing = [pk for pk in author_ids if pk not in cards]
+    record_cache(not missing)
+    if missing:
+        loaded = _load_cards(missing)
+        cache.set_many(
+            {
+                _card_key(pk, versions[pk]): card
+                for pk, card in loaded.items()
+            },
+            CARD_TIMEOUT,
+        )
+        cards.update(loaded)
+    followed = following_ids(request)
+    return {
+        pk: dict(card, following=pk in followed)
+        for pk, card in cards.items()
+    }
+
+
+def author_card(request, author):
+    """Карточка одного автора; если счетчики прочитать не удалось,
+    показываем нули, а не падаем."""
+    card = author_cards(request, [author.pk]).get(author.pk)
+    if card is None:
+        card = {
+            "author": author,
+            "post_amt": 0,
+            "follower_amt": 0,
+            "following_amt": 0,
+            "following": author.pk in following_ids(request),
+        }
+    return card
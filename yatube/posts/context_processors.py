@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .cache import following_ids
+
+
+def following(request):
+    """``{% if author.pk in following_ids %}`` в любом шаблоне; множество
+    загружается, только если шаблон к нему обратился."""
+    return {
+        "following_ids": SimpleLazyObject(lambda: following_ids(request))
+    }
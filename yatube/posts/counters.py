@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _count(queryset, field, outer="pk"):
+    """Подзапрос с числом строк queryset, ссылающихся на внешнюю строку."""
+    counts = queryset.filter(**{field: OuterRef(outer)}).order_by().values(
+        field
+    ).annotate(amount=Count("pk")).values("amount")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def _shift(name, delta):
+    # Разошедшийся счетчик не должен уходить ниже нуля.
+    return Greatest(F(name) + delta, 0)
+
+
+def change_user_stats(user_id, **deltas):
+    """Сдвигает счетчики пользователя на заданные величины."""
+    UserStats.objects.filter(user_id=user_id).update(
+        **{name: _shift(name, delta) for name, delta in deltas.items()}
+    )
+
+
+def change_comment_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=_shift("comment_count", delta)
+    )
+
+
+def user_stats(user):
+    """Счетчики пользователя; строка создается при первом обращении."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        rebuild_user_stats(User.objects.filter(pk=user.pk))
+        return UserStats.objects.get(user=user)
+
+
+@transaction.atomic
+def rebuild_user_stats(users=None):
+    """Пересчитывает счетчики пользователей одним UPDATE на таблицу."""
+    if users is None:
+        users = User.objects.all()
+    missing = users.filter(stats__isnull=True).values_list("pk", flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing.iterator()],
+        ignore_conflicts=True,
+    )
+    amount = UserStats.objects.filter(user__in=users).update(
+        posts_count=_count(Post.objects.all(), "author_id", "user_id"),
+        followers_count=_count(Follow.objects.all(), "author_id", "user_id"),
+        following_count=_count(Follow.objects.all(), "user_id", "user_id"),
+    )
+    # Посты популярных авторов не рассылаются (см. timeline.py).
+    UserStats.objects.filter(
+        user__in=users,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(timeline_fanout=False)
+    return amount
+
+
+@transaction.atomic
+def rebuild_comment_counts(posts=None):
+    if posts is None:
+        posts = Post.objects.all()
+    return posts.update(
+        comment_count=_count(Comment.objects.all(), "post_id")
+    )
@@ -0,0 +1,77 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import feed_version
+from .models import UserStats
+from .trending import record_view
+
+
+def conditional_page(stamp=None):
+    """Отвечает 304 по ETag, не выполняя view и не рендеря шаблон.
+
+    ETag собирается из версии ленты (хранится в базе и меняется при
+    любой правке постов и комментариев), параметров запроса и того, что вернет
+    ``stamp(request, *args, **kwargs)``. Для вошедших пользователей в
+    него входят id пользователя и CSRF-cookie, а ответ помечается как
+    private.
+    """
+
+    def etag(request, *args, **kwargs):
+        parts = [str(feed_version()), request.GET.urlencode()]
+        if stamp is not None:
+            parts += [str(part) for part in stamp(request, *args, **kwargs)]
+        if request.user.is_authenticated:
+            parts += [
+                str(request.user.pk), request.META.get("CSRF_COOKIE", "")
+            ]
+        return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_vary_headers(response, ("Cookie",))
+            visibility = (
+                "private" if request.user.is_authenticated else "public"
+            )
+            patch_cache_control(
+                response, max_age=0, must_revalidate=True,
+                **{visibility: True}
+            )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def author_stamp(request, username, **kwargs):
+    """Счетчики автора: меняются при новых постах и подписках."""
+    return [username, kwargs.get("post_id", "")] + list(
+        UserStats.objects.filter(user__username=username).values_list(
+            "posts_count", "followers_count", "following_count"
+        )
+    )
+
+
+def group_stamp(request, slug):
+    return [slug]
+
+
+def counts_view(view):
+    """Считает просмотр поста ``post_id`` и при ответе 304, поэтому
+    ставится поверх conditional_page."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            record_view(kwargs["post_id"])
+        return response
+
+    return wrapper
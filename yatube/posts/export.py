@@ -0,0 +1,130 @@
+"""Потоковая выгрузка постов с комментариями в NDJSON или CSV.
+
+Посты читаются пачками по ключу (id), комментарии пачки — одним
+потоком через iterator() и сразу уходят в вывод, поэтому память не
+растет ни с числом постов автора, ни с числом комментариев под постом.
+"""
+import csv
+import json
+from itertools import groupby
+from operator import attrgetter
+
+from .models import Comment
+
+BATCH_SIZE = 500
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+CSV_FIELDS = ("type", "id", "post_id", "author", "group", "date", "text")
+
+
+def iter_posts(queryset, batch_size=BATCH_SIZE):
+    """Пары (пост, итератор его комментариев) в порядке id.
+
+    Комментарии читаются из общего потока пачки, поэтому их нужно
+    перебрать до перехода к следующему посту.
+    """
+    queryset = queryset.select_related("author", "group").order_by("pk")
+    last_pk = 0
+    while True:
+        posts = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not posts:
+            return
+        comments = Comment.objects.filter(
+            post_id__in=[post.pk for post in posts]
+        ).select_related("author").order_by("post_id", "created", "pk")
+        groups = groupby(
+            comments.iterator(chunk_size=batch_size),
+            key=attrgetter("post_id"),
+        )
+        group = next(groups, None)
+        for post in posts:
+            if group is not None and group[0] == post.pk:
+                yield post, group[1]
+                group = next(groups, None)
+            else:
+                yield post, iter(())
+        if len(posts) < batch_size:
+            return
+        last_pk = posts[-1].pk
+
+
+def serialize(post):
+    return {
+        "id": post.pk,
+        "author": post.author.username,
+        "group": post.group.slug if post.group else None,
+        "pub_date": post.pub_date.isoformat(),
+        "text": post.text,
+        "image": post.image.name or None,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        "id": comment.pk,
+        "author": comment.author.username,
+        "created": comment.created.isoformat(),
+        "text": comment.text,
+    }
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def ndjson_lines(items):
+    """Строка поста отдается по частям: список комментариев пишется
+    по одному, не собираясь целиком."""
+    for post, comments in items:
+        yield _json(serialize(post))[:-1] + ', "comments": ['
+        separator = ""
+        for comment in comments:
+            yield separator + _json(serialize_comment(comment))
+            separator = ", "
+        yield "]}\n"
+
+
+class _Line:
+    """Файлоподобный объект для csv.writer: возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(items):
+    """Строка поста, за ней строки его комментариев."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(CSV_FIELDS)
+    for post, comments in items:
+        yield writer.writerow((
+            "post", post.pk, post.pk, post.author.username,
+            post.group.slug if post.group else "",
+            post.pub_date.isoformat(), post.text,
+        ))
+        for comment in comments:
+            yield writer.writerow((
+                "comment", comment.pk, post.pk, comment.author.username, "",
+                comment.created.isoformat(), comment.text,
+            ))
+
+
+def export_lines(queryset, export_format, batch_size=BATCH_SIZE):
+    write = ndjson_lines if export_format == "ndjson" else csv_lines
+    return write(iter_posts(queryset, batch_size))
+
+
+def buffered(lines, size=CHUNK_SIZE):
+    """Склеивает строки в куски около size символов: меньше вызовов
+    записи и лучше сжатие gzip."""
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk)
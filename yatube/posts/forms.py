@@ -1,6 +1,7 @@
 from django import forms
 from django.forms import Textarea
 
+from .images import check_limits, process_upload
 from .models import Post, Comment
 
 
@@ -27,6 +28,19 @@ class PostForm(forms.ModelForm):
             )
         return data
 
+    def clean_image(self):
+        data = self.cleaned_data["image"]
+        if "image" not in self.changed_data:
+            return data
+        if not data:
+            self.instance.image_hash = ""
+            return data
+        error = check_limits(data)
+        if error:
+            raise forms.ValidationError(error)
+        data, self.instance.image_hash = process_upload(data)
+        return data
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
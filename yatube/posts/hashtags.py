@@ -0,0 +1,105 @@
+"""Индекс хештегов и упоминаний в постах.
+
+Строки PostTag и Mention обновляются сигналом при сохранении поста:
+пропавшие из текста удаляются, новые добавляются. rebuild() собирает
+индекс заново для всех постов.
+"""
+from django.db import transaction
+
+from .models import Mention, Post, PostTag, Tag, User
+from .rendering import extract_mentions, extract_tags
+
+BATCH_SIZE = 500
+# Не больше параметров в одном IN, чем позволяет старый SQLite.
+IN_SIZE = 500
+
+
+def _ids(queryset, field, values):
+    """{значение: id} для существующих строк."""
+    values = list(values)
+    ids = {}
+    for start in range(0, len(values), IN_SIZE):
+        ids.update(queryset.filter(**{
+            f"{field}__in": values[start:start + IN_SIZE]
+        }).values_list(field, "pk"))
+    return ids
+
+
+def tag_ids(names):
+    """id тегов по именам; недостающие теги создаются."""
+    ids = _ids(Tag.objects, "name", names)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name) for name in missing], ignore_conflicts=True
+        )
+        ids.update(_ids(Tag.objects, "name", missing))
+    return ids
+
+
+def user_ids(usernames):
+    return _ids(User.objects, "username", usernames)
+
+
+def _mentioned(post_author_id, usernames, ids):
+    # Себя в своем посте не упоминают.
+    return {
+        ids[name] for name in usernames
+        if name in ids and ids[name] != post_author_id
+    }
+
+
+def _sync(model, post, field, wanted, created):
+    rows = model.objects.filter(post=post)
+    current = set() if created else set(rows.values_list(field, flat=True))
+    if current - wanted:
+        rows.filter(**{f"{field}__in": current - wanted}).delete()
+    model.objects.bulk_create([
+        model(post=post, pub_date=post.pub_date, **{field: pk})
+        for pk in wanted - current
+    ], ignore_conflicts=True)
+
+
+def index_post(post, created=False):
+    tags = extract_tags(post.text)
+    usernames = extract_mentions(post.text)
+    wanted_tags = set(tag_ids(tags).values())
+    wanted_users = _mentioned(post.author_id, usernames, user_ids(usernames))
+    _sync(PostTag, post, "tag_id", wanted_tags, created)
+    _sync(Mention, post, "user_id", wanted_users, created)
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Разбирает тексты всех постов пачками по ключу id."""
+    PostTag.objects.all().delete()
+    Mention.objects.all().delete()
+    posts = Post.objects.order_by("pk").values_list(
+        "pk", "author_id", "pub_date", "text"
+    )
+    last_pk, amount = 0, 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return amount
+        parsed = [
+            (pk, author_id, pub_date, extract_tags(text),
+             extract_mentions(text))
+            for pk, author_id, pub_date, text in batch
+        ]
+        tags = tag_ids(list({
+            name for row in parsed for name in row[3]
+        }))
+        users = user_ids({name for row in parsed for name in row[4]})
+        with transaction.atomic():
+            PostTag.objects.bulk_create([
+                PostTag(post_id=pk, tag_id=tags[name], pub_date=pub_date)
+                for pk, _, pub_date, names, _ in parsed
+                for name in names
+            ])
+            Mention.objects.bulk_create([
+                Mention(post_id=pk, user_id=user_id, pub_date=pub_date)
+                for pk, author_id, pub_date, _, usernames in parsed
+                for user_id in _mentioned(author_id, usernames, users)
+            ])
+        amount += len(batch)
+        last_pk = batch[-1][0]
@@ -0,0 +1,97 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+UPLOAD_TO = "posts/"
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(upload):
+    """SHA-256 загруженного файла, читаемого по частям."""
+    digest = hashlib.sha256()
+    upload.seek(0)
+    for chunk in upload.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def stored_name(image_hash):
+    extension = settings.POST_IMAGE_FORMAT.lower()
+    return f"{UPLOAD_TO}{image_hash}.{extension}"
+
+
+def check_limits(upload):
+    """Проверяет размер файла и картинки, не декодируя ее целиком."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        megabytes = settings.POST_IMAGE_MAX_BYTES // (1024 * 1024)
+        return f"Файл больше {megabytes} МБ"
+    upload.seek(0)
+    # Image.open читает только заголовок файла.
+    with Image.open(upload) as image:
+        width, height = image.size
+    upload.seek(0)
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        return "Слишком большое разрешение картинки"
+    return None
+
+
+# Значения EXIF Orientation, при которых картинка повернута на 90°.
+TRANSPOSED = {5, 6, 7, 8}
+
+
+def draft_size(image, max_width):
+    """Размер для Image.draft в осях файла: после поворота по EXIF
+    ширина картинки должна остаться не меньше max_width. None, если
+    картинка и так не шире."""
+    transposed = image.getexif().get(0x0112) in TRANSPOSED
+    width, height = image.size[::-1] if transposed else image.size
+    if width <= max_width:
+        return None
+    size = (max_width, round(height * max_width / width))
+    return size[::-1] if transposed else size
+
+
+def normalize(upload):
+    """Перекодирует картинку: без EXIF, не шире POST_IMAGE_MAX_WIDTH,
+    в формате POST_IMAGE_FORMAT."""
+    max_width = settings.POST_IMAGE_MAX_WIDTH
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # Для JPEG draft уменьшает картинку уже при декодировании.
+        size = draft_size(image, max_width)
+        if size is not None:
+            image.draft("RGB", size)
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        if image.width > max_width:
+            height = round(image.height * max_width / image.width)
+            image = image.resize((max_width, height), Image.LANCZOS)
+        output = BytesIO()
+        image.save(
+            output,
+            settings.POST_IMAGE_FORMAT,
+            quality=settings.POST_IMAGE_QUALITY,
+        )
+    return output.getvalue()
+
+
+def process_upload(upload):
+    """Возвращает (значение для ImageField, хеш содержимого).
+
+    Одинаковые картинки хранятся один раз: если файл с таким хешем
+    уже сохранен, пост ссылается на него без повторной обработки.
+    """
+    image_hash = content_hash(upload)
+    name = stored_name(image_hash)
+    if default_storage.exists(name):
+        return name, image_hash
+    return ContentFile(normalize(upload), os.path.basename(name)), image_hash
@@ -0,0 +1,100 @@
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.benchmark import VIEWS, Benchmark, dataset
+from posts import seeding
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True, check=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет p50/p99 задержки и число SQL-запросов страниц ленты. "
+        "С --seed сначала заполняет базу синтетическими данными — "
+        "запускайте на отдельной базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true",
+                            help="Заполнить базу перед замерами.")
+        parser.add_argument("--users", type=int, default=seeding.USERS)
+        parser.add_argument("--posts", type=int, default=seeding.POSTS)
+        parser.add_argument("--comments", type=int,
+                            default=seeding.COMMENTS)
+        parser.add_argument("--groups", type=int, default=seeding.GROUPS)
+        parser.add_argument("--follows", type=int, default=seeding.FOLLOWS,
+                            help="Среднее число подписок пользователя.")
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--views", nargs="+", choices=VIEWS,
+                            default=list(VIEWS))
+        parser.add_argument("--warm", action="store_true",
+                            help="Не сбрасывать кеш между запросами.")
+        parser.add_argument("--random-seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark.json",
+                            help="Файл для результатов в JSON.")
+        parser.add_argument("--baseline",
+                            help="Прошлые результаты для сравнения.")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            seeding.Seeder(
+                users=options["users"],
+                posts=options["posts"],
+                comments=options["comments"],
+                groups=options["groups"],
+                follows=options["follows"],
+                random_seed=options["random_seed"],
+                log=self.stdout.write,
+            ).run()
+        views = Benchmark(
+            iterations=options["iterations"],
+            warm=options["warm"],
+            random_seed=options["random_seed"],
+        ).run(options["views"])
+        results = {
+            "created": timezone.now().isoformat(),
+            "commit": current_commit(),
+            "iterations": options["iterations"],
+            "warm": options["warm"],
+            "dataset": dataset(),
+            "views": views,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(results, output, ensure_ascii=False, indent=2)
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"]) as source:
+                baseline = json.load(source)["views"]
+        for view, data in views.items():
+            line = (
+                f"{view}: p50 {data['p50_ms']} мс, p99 {data['p99_ms']} мс, "
+                f"запросов {data['queries_mean']}"
+            )
+            if view in baseline:
+                line += self.compare(baseline[view], data)
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f"Результаты сохранены в {options['output']}"
+        ))
+
+    @staticmethod
+    def compare(before, after):
+        changes = []
+        for key in ("p50_ms", "p99_ms"):
+            if before[key]:
+                delta = (after[key] - before[key]) / before[key] * 100
+                changes.append(f"{key[:3]} {delta:+.0f}%")
+        queries = after["queries_mean"] - before["queries_mean"]
+        changes.append(f"запросов {queries:+g}")
+        return " (" + ", ".join(changes) + ")"
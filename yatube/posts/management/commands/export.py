@@ -0,0 +1,58 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает посты с комментариями в NDJSON или CSV: все, одного "
+        "автора или одной группы."
+    )
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group()
+        target.add_argument("--author", help="Имя пользователя.")
+        target.add_argument("--group", help="slug группы.")
+        parser.add_argument("--format", choices=export.FORMATS,
+                            default="ndjson")
+        parser.add_argument("--output", default="-",
+                            help="Файл; по умолчанию stdout.")
+        parser.add_argument("--gzip", action="store_true",
+                            help="Сжимать gzip (включается и для *.gz).")
+        parser.add_argument("--batch-size", type=int,
+                            default=export.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options["author"]:
+            if not User.objects.filter(username=options["author"]).exists():
+                raise CommandError(f"Нет пользователя {options['author']}")
+            posts = posts.filter(author__username=options["author"])
+        elif options["group"]:
+            if not Group.objects.filter(slug=options["group"]).exists():
+                raise CommandError(f"Нет группы {options['group']}")
+            posts = posts.filter(group__slug=options["group"])
+        lines = export.buffered(export.export_lines(
+            posts, options["format"], options["batch_size"]
+        ))
+        output = options["output"]
+        compress = options["gzip"] or output.endswith(".gz")
+        if output == "-" and compress:
+            with gzip.GzipFile(fileobj=sys.stdout.buffer, mode="wb") as stream:
+                self.write(stream, lines)
+        elif output == "-":
+            for chunk in lines:
+                self.stdout.write(chunk, ending="")
+        else:
+            opener = gzip.open if compress else open
+            with opener(output, "wb") as stream:
+                self.write(stream, lines)
+
+    @staticmethod
+    def write(stream, chunks):
+        for chunk in chunks:
+            stream.write(chunk.encode())
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import render_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Готовит миниатюры для постов, у которых их еще нет."
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image=None).filter(
+            thumbnail_url=""
+        ).values_list("pk", flat=True)
+        amount = 0
+        for post_id in list(posts):
+            render_thumbnails(post_id)
+            amount += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Обработано постов: {amount}"
+        ))
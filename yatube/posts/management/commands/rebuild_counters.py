@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import rebuild_comment_counts, rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счетчики постов, подписок и комментариев."
+
+    def handle(self, *args, **options):
+        users = rebuild_user_stats()
+        posts = rebuild_comment_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"Обновлено пользователей: {users}, постов: {posts}"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс постов и комментариев."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Сколько записей индексировать за одну транзакцию.",
+        )
+
+    def handle(self, *args, **options):
+        amount = get_backend().rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Проиндексировано документов: {amount}"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.hashtags import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Заново разбирает хештеги и упоминания во всех постах. "
+        "Ссылки в готовом HTML обновляет команда render_text --all."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Сколько постов разбирать за одну транзакцию.",
+        )
+
+    def handle(self, *args, **options):
+        amount = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Разобрано постов: {amount}"
+        ))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Comment, Post
+from posts.rendering import existing_usernames
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет готовый HTML текста постов и комментариев пачками. "
+        "Нужна после миграции и после изменения posts.rendering."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Пересобрать HTML у всех записей, а не только у пустых.",
+        )
+        parser.add_argument(
+            "--pause", type=float, default=0,
+            help="Пауза между пачками в секундах, чтобы не занимать базу.",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            amount = self.backfill(model, options)
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name_plural}: обновлено {amount}"
+            ))
+
+    def backfill(self, model, options):
+        rows = model.objects.order_by("pk").only("pk", "text")
+        if not options["all"]:
+            rows = rows.filter(text_html="")
+        last_pk, amount = 0, 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_pk)[:options["batch_size"]])
+            if not batch:
+                return amount
+            usernames = existing_usernames(obj.text for obj in batch)
+            for obj in batch:
+                obj.render_html(usernames)
+            with transaction.atomic():
+                model.objects.bulk_update(batch, ["text_html"])
+            amount += len(batch)
+            last_pk = batch[-1].pk
+            if options["pause"]:
+                time.sleep(options["pause"])
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Массово загружает пользователей, группы, посты, комментарии и "
+        "подписки из файлов JSONL/CSV (users.jsonl, posts.csv и т. п.) "
+        "или генерирует синтетические, если файлы не указаны."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*")
+        parser.add_argument("--users", type=int, default=seeding.USERS)
+        parser.add_argument("--posts", type=int, default=seeding.POSTS)
+        parser.add_argument("--comments", type=int,
+                            default=seeding.COMMENTS)
+        parser.add_argument("--groups", type=int, default=seeding.GROUPS)
+        parser.add_argument("--follows", type=int, default=seeding.FOLLOWS,
+                            help="Среднее число подписок пользователя.")
+        parser.add_argument("--random-seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size", type=int, default=seeding.BATCH_SIZE,
+            help="Сколько записей вставлять за одну транзакцию.",
+        )
+
+    def handle(self, *args, **options):
+        if options["files"]:
+            importer = seeding.Importer(
+                batch_size=options["batch_size"], log=self.stdout.write
+            )
+            try:
+                loaded = importer.run(options["files"])
+            except (KeyError, ValueError) as error:
+                raise CommandError(f"Ошибка в данных: {error}")
+        else:
+            loaded = seeding.Seeder(
+                users=options["users"],
+                posts=options["posts"],
+                comments=options["comments"],
+                groups=options["groups"],
+                follows=options["follows"],
+                random_seed=options["random_seed"],
+                batch_size=options["batch_size"],
+                log=self.stdout.write,
+            ).run()
+        self.stdout.write(self.style.SUCCESS(", ".join(
+            f"{kind}: {amount}" for kind, amount in loaded.items()
+        )))
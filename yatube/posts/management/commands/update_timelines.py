@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import resume_fanout
+
+
+class Command(BaseCommand):
+    help = (
+        "Возобновляет рассылку постов авторам, у которых подписчиков "
+        "стало не больше TIMELINE_FANOUT_RESUME, и раскладывает их "
+        "последние посты по лентам. Запускается по расписанию."
+    )
+
+    def handle(self, *args, **options):
+        amount = resume_fanout()
+        self.stdout.write(self.style.SUCCESS(
+            f"Авторов с возобновленной рассылкой: {amount}"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает рейтинг популярного и удаляет счетчики "
+        "активности старше окна. Запускается по расписанию чаще, "
+        "чем истекает TRENDING_TIMEOUT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Сначала пересчитать комментарии по таблице комментариев.",
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            trending.rebuild()
+        removed = trending.prune()
+        ids = trending.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"Постов в рейтинге: {len(ids)}, удалено счетчиков: {removed}"
+        ))
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5("
+        "text, post_id UNINDEXED, tokenize = 'unicode61')"
+    )
+    # Заполняем индекс уже существующими постами и комментариями.
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, text, post_id) "
+        "SELECT id * 2, text, id FROM posts_post"
+    )
+    schema_editor.execute(
+        "INSERT INTO posts_search (rowid, text, post_id) "
+        "SELECT id * 2 + 1, text, post_id FROM posts_comment "
+        "WHERE post_id IS NOT NULL"
+    )
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS posts_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_image_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
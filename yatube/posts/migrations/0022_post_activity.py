@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 02:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_tags_mentions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('comments', models.PositiveIntegerField(default=0)),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity', to='posts.Post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='postactivity',
+            index=models.Index(fields=['hour'], name='posts_posta_hour_eb5ce0_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='postactivity',
+            constraint=models.UniqueConstraint(fields=('post', 'hour'), name='unique_post_activity'),
+        ),
+    ]
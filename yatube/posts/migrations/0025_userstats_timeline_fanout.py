@@ -0,0 +1,27 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_popular_authors(apps, schema_editor):
+    UserStats = apps.get_model("posts", "UserStats")
+    UserStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+    ).update(timeline_fanout=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='timeline_fanout',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(mark_popular_authors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    FeedVersion = apps.get_model("posts", "FeedVersion")
+    FeedVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_userstats_timeline_fanout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.safestring import mark_safe
+
+from .rendering import existing_usernames, render_text
 
 User = get_user_model()
 
@@ -13,8 +16,56 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
-    objects: models.Manager()
+class RenderedQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create не вызывает save(): готовим HTML здесь.
+        objs = list(objs)
+        usernames = existing_usernames(obj.text for obj in objs)
+        for obj in objs:
+            obj.render_html(usernames)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class RenderedText(models.Model):
+    """Текст с заранее подготовленным HTML (см. rendering.py)."""
+    text_html = models.TextField(blank=True, editable=False)
+    # Ссылки на страницы тегов: только у того, что попадает в индекс.
+    tag_links = True
+
+    class Meta:
+        abstract = True
+
+    def render_html(self, usernames=None):
+        """usernames — существующие пользователи из упоминаний, если
+        они уже выбраны для целой пачки."""
+        if usernames is None:
+            usernames = existing_usernames([self.text])
+        self.text_html = render_text(self.text, self.tag_links, usernames)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "text" in update_fields:
+            self.render_html()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "text_html"}
+        super().save(*args, **kwargs)
+
+    @property
+    def html(self):
+        # Строки, которые еще не обработала команда render_text.
+        return mark_safe(
+            self.text_html or render_text(self.text, self.tag_links)
+        )
+
+
+class PostQuerySet(RenderedQuerySet):
+    def feed(self):
+        """Посты для ленты: автор и группа выбираются одним запросом."""
+        return self.select_related("author", "group")
+
+
+class Post(RenderedText):
+    objects = PostQuerySet.as_manager()
     text = models.TextField()
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
     author = models.ForeignKey(
@@ -25,16 +76,30 @@ class Post(models.Model):
         related_name="group_posts", blank=True, null=True
     )
     image = models.ImageField(upload_to="posts/", blank=True, null=True)
+    image_hash = models.CharField(
+        max_length=64, blank=True, editable=False, db_index=True
+    )
+    thumbnail_url = models.CharField(
+        max_length=255, blank=True, editable=False
+    )
+    thumbnail_srcset = models.TextField(blank=True, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-pub_date"]
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"]),
+            models.Index(fields=["author", "-pub_date", "-id"]),
+            models.Index(fields=["group", "-pub_date", "-id"]),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
-class Comment(models.Model):
-    objects: models.Manager()
+class Comment(RenderedText):
+    objects = RenderedQuerySet.as_manager()
+    tag_links = False
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE,
         related_name="comments", blank=True, null=True
@@ -47,6 +112,7 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [models.Index(fields=["post", "-created", "-id"])]
 
 
 class Follow(models.Model):
@@ -57,5 +123,122 @@ class Follow(models.Model):
         User, on_delete=models.CASCADE, related_name="following"
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            )
+        ]
+
     def __str__(self):
         return f'{self.user} follows {self.author}'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="stats"
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Посты рассылаются по лентам подписчиков; у популярных авторов
+    # лента подписок читает их напрямую (см. timeline.py).
+    timeline_fanout = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f'{self.user} stats'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [models.Index(fields=["user", "-pub_date", "-post"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_post"
+            )
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class PostTag(models.Model):
+    """Строка индекса тегов; дата поста скопирована, чтобы лента тега
+    читалась по индексу (tag, pub_date)."""
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="post_tags"
+    )
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name="post_tags"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [models.Index(fields=["tag", "-pub_date", "-id"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tag", "post"], name="unique_post_tag"
+            )
+        ]
+
+
+class Mention(models.Model):
+    """Упоминание пользователя через @ в посте."""
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="mentions"
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="mentions"
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [models.Index(fields=["user", "-pub_date", "-id"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_mention"
+            )
+        ]
+
+
+class PostActivity(models.Model):
+    """Комментарии и просмотры поста за час; из них считается
+    рейтинг популярного (см. trending.py)."""
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="activity"
+    )
+    hour = models.DateTimeField()
+    comments = models.PositiveIntegerField(default=0)
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [models.Index(fields=["hour"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "hour"], name="unique_post_activity"
+            )
+        ]
+
+
+class FeedVersion(models.Model):
+    """Версия ленты в базе: меняется при любой правке постов и
+    комментариев и одинакова для всех процессов (см. cache.py)."""
+    version = models.BigIntegerField(default=0)
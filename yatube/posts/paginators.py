@@ -0,0 +1,324 @@
+import heapq
+import math
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes, force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+CURSOR_PARAMS = ("after", "before", "page")
+# Глубже по старым ссылкам ?page=N не идем: OFFSET должен поместиться
+# в целое базы, а такие страницы все равно пусты.
+MAX_LEGACY_PAGE = 100_000
+ID_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _in_range(value):
+    """Значение курсора можно безопасно подставить в запрос."""
+    if isinstance(value, int):
+        return value in ID_RANGE
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return value is not None
+
+
+def cursor_params(params):
+    """Только параметры страницы из params. По ним строятся страницы,
+    которые кешируются для всех: ссылки на соседние страницы не должны
+    унести чужие параметры запроса (utm-метки и т.п.)."""
+    result = QueryDict(mutable=True)
+    for param in CURSOR_PARAMS:
+        if param in params:
+            result[param] = params[param]
+    return result
+
+
+def encode_cursor(*values):
+    """Непрозрачный курсор из значений ключа сортировки."""
+    raw = "|".join(str(value) for value in values)
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token, *types):
+    """Разбирает курсор, приводя части к types.
+
+    На испорченный токен и значения, которые не поместятся в запрос,
+    возвращает None.
+    """
+    try:
+        parts = force_str(urlsafe_base64_decode(token)).split("|")
+        if len(parts) != len(types):
+            return None
+        values = tuple(cast(part) for cast, part in zip(types, parts))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    if not all(_in_range(value) for value in values):
+        return None
+    return values
+
+
+class CursorPaginator(Paginator):
+    """Основа пагинаторов по курсору: без COUNT(*) и OFFSET.
+
+    Следующая страница запрашивается через ``?after=<курсор>``,
+    предыдущая — через ``?before=<курсор>``. Остальные параметры
+    запроса сохраняются в ссылках.
+    """
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list, per_page)
+        self.params = None
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def __getstate__(self):
+        # Страница уже выбрана; исходный QuerySet в кеш не кладем,
+        # иначе pickle вычитает его целиком.
+        state = self.__dict__.copy()
+        state["object_list"] = None
+        return state
+
+    def cursor(self, item):
+        raise NotImplementedError
+
+    def fetch(self, params):
+        """Возвращает (записи страницы, есть ли предыдущая, есть ли
+        следующая)."""
+        raise NotImplementedError
+
+    def get_page(self, params):
+        self.params = params
+        items, has_previous, has_next = self.fetch(params)
+        if items:
+            if has_next:
+                self.next_cursor = self.cursor(items[-1])
+            if has_previous:
+                self.previous_cursor = self.cursor(items[0])
+        # Page вычисляет has_next/has_previous через number и num_pages,
+        # поэтому подставляем их без подсчета записей.
+        number = 2 if self.previous_cursor else 1
+        self.num_pages = number + 1 if self.next_cursor else number
+        return Page(items, number, self)
+
+    def _query(self, name, cursor):
+        params = self.params.copy()
+        for param in CURSOR_PARAMS:
+            params.pop(param, None)
+        params[name] = cursor
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query("after", self.next_cursor)
+
+    @property
+    def previous_query(self):
+        return self._query("before", self.previous_cursor)
+
+
+class KeysetPaginator(CursorPaginator):
+    """Пагинатор ленты по ключу (pub_date, id), новые записи первыми.
+
+    Старые ссылки ``?page=N`` обслуживаются смещением, но тоже без
+    подсчета всех записей.
+    """
+
+    field = "pub_date"
+    max_legacy_page = MAX_LEGACY_PAGE
+
+    def cursor(self, item):
+        return encode_cursor(getattr(item, self.field).isoformat(), item.pk)
+
+    def fetch(self, params):
+        after = decode_cursor(params.get("after", ""), parse_datetime, int)
+        before = decode_cursor(params.get("before", ""), parse_datetime, int)
+        queryset = self.object_list
+        if after is not None:
+            return self._after(queryset, *after)
+        if before is not None:
+            return self._before(queryset, *before)
+        return self._legacy(queryset, params.get("page"))
+
+    def _after(self, queryset, value, pk):
+        rows = list(queryset.filter(
+            Q(**{f"{self.field}__lt": value})
+            | Q(**{self.field: value, "pk__lt": pk})
+        ).order_by(f"-{self.field}", "-pk")[:self.per_page + 1])
+        return rows[:self.per_page], True, len(rows) > self.per_page
+
+    def _before(self, queryset, value, pk):
+        rows = list(queryset.filter(
+            Q(**{f"{self.field}__gt": value})
+            | Q(**{self.field: value, "pk__gt": pk})
+        ).order_by(self.field, "pk")[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        return rows[:self.per_page][::-1], has_previous, True
+
+    def _legacy(self, queryset, page_number):
+        try:
+            number = min(max(int(page_number), 1), self.max_legacy_page)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = list(queryset.order_by(f"-{self.field}", "-pk")[
+            offset:offset + self.per_page + 1
+        ])
+        return rows[:self.per_page], number > 1, len(rows) > self.per_page
+
+
+class MergedPaginator(KeysetPaginator):
+    """Лента постов из нескольких источников по ключу (pub_date, id поста).
+
+    sources — пары (QuerySet, поле с id поста); у строк источника есть
+    pub_date. Каждый источник читается своим срезом по ключу не больше
+    страницы, срезы сливаются, а посты страницы загружаются одним
+    in_bulk из object_list. Источники не должны пересекаться.
+    """
+
+    # Смещение читается из каждого источника целиком, а лента подписок
+    # и так хранит не больше TIMELINE_SIZE записей.
+    max_legacy_page = 100
+
+    def __init__(self, sources, posts, per_page):
+        super().__init__(posts, per_page)
+        self.sources = sources
+
+    def _keys(self, descending, limit, key=None):
+        lists = []
+        for queryset, post_field in self.sources:
+            rows = queryset.values_list("pub_date", post_field)
+            if key is not None:
+                value, pk = key
+                lookup = "lt" if descending else "gt"
+                rows = rows.filter(
+                    Q(**{f"pub_date__{lookup}": value})
+                    | Q(**{"pub_date": value, f"{post_field}__{lookup}": pk})
+                )
+            order = ("pub_date", post_field)
+            if descending:
+                order = tuple(f"-{field}" for field in order)
+            lists.append(list(rows.order_by(*order)[:limit]))
+        merged = heapq.merge(*lists, reverse=descending)
+        return [pk for _, pk in merged][:limit]
+
+    def _posts(self, ids):
+        posts = self.object_list.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def _after(self, queryset, value, pk):
+        ids = self._keys(True, self.per_page + 1, (value, pk))
+        return self._posts(ids[:self.per_page]), True, len(ids) > self.per_page
+
+    def _before(self, queryset, value, pk):
+        ids = self._keys(False, self.per_page + 1, (value, pk))
+        has_previous = len(ids) > self.per_page
+        return self._posts(ids[:self.per_page][::-1]), has_previous, True
+
+    def _legacy(self, queryset, page_number):
+        try:
+            number = min(max(int(page_number), 1), self.max_legacy_page)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        ids = self._keys(True, offset + self.per_page + 1)[offset:]
+        has_next = len(ids) > self.per_page
+        return self._posts(ids[:self.per_page]), number > 1, has_next
+
+
+class CommentPaginator(KeysetPaginator):
+    """Комментарии поста по ключу (created, id), новые первыми."""
+
+    field = "created"
+
+
+class IndexPaginator(KeysetPaginator):
+    """Посты по строкам индекса тегов или упоминаний.
+
+    Ключ страницы — (pub_date, id) строки индекса, поэтому строки идут
+    в порядке индекса без сортировки самих постов.
+    """
+
+    def cursor(self, item):
+        return super().cursor(item.index_row)
+
+    def fetch(self, params):
+        rows, has_previous, has_next = super().fetch(params)
+        posts = []
+        for row in rows:
+            row.post.index_row = row
+            posts.append(row.post)
+        return posts, has_previous, has_next
+
+
+class SearchPaginator(CursorPaginator):
+    """Пагинатор ранжированной выдачи поискового индекса."""
+
+    def __init__(self, backend, query, queryset, per_page):
+        super().__init__(queryset, per_page)
+        self.backend = backend
+        self.query = query
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state["backend"] = None
+        return state
+
+    def cursor(self, item):
+        return encode_cursor(*item.search_key)
+
+    def fetch(self, params):
+        after = decode_cursor(params.get("after", ""), float, int)
+        before = decode_cursor(params.get("before", ""), float, int)
+        rows = self.backend.search(
+            self.query, self.per_page + 1, after=after, before=before
+        )
+        if before is not None:
+            has_previous = len(rows) > self.per_page
+            rows = rows[-self.per_page:]
+            has_next = True
+        else:
+            has_previous = after is not None
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        posts = self.object_list.in_bulk([post_id for _, post_id in rows])
+        items = []
+        for key in rows:
+            post = posts.get(key[1])
+            if post is not None:
+                post.search_key = key
+                items.append(post)
+        return items, has_previous, has_next
+
+
+class RankPaginator(CursorPaginator):
+    """Страницы готового рейтинга: object_list — список id постов от
+    первого места, курсор — место в рейтинге."""
+
+    def __init__(self, ranking, queryset, per_page):
+        super().__init__(ranking, per_page)
+        self.queryset = queryset
+
+    def cursor(self, item):
+        return encode_cursor(item.rank)
+
+    def fetch(self, params):
+        after = decode_cursor(params.get("after", ""), int)
+        before = decode_cursor(params.get("before", ""), int)
+        if after is not None:
+            start = max(after[0] + 1, 0)
+        elif before is not None:
+            start = max(before[0] - self.per_page, 0)
+        else:
+            start = 0
+        ids = self.object_list[start:start + self.per_page]
+        posts = self.queryset.in_bulk(ids)
+        items = []
+        for rank, pk in enumerate(ids, start):
+            # Пост могли удалить после пересчета рейтинга.
+            if pk in posts:
+                posts[pk].rank = rank
+                items.append(posts[pk])
+        has_next = start + self.per_page < len(self.object_list)
+        return items, start > 0, has_next
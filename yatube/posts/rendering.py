@@ -0,0 +1,88 @@
+"""Готовый HTML текста постов и комментариев.
+
+Текст превращается в HTML один раз при сохранении, шаблоны выводят
+его как есть. Сначала текст экранируется, дальше шаги работают уже
+с безопасным HTML. Ссылки ставятся только туда, где есть страница:
+на теги — только в постах (комментарии в индекс тегов не попадают),
+на упоминания — только для существующих пользователей.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.text import normalize_newlines
+
+TAG_LENGTH = 100
+# Не больше параметров в одном IN, чем позволяет старый SQLite.
+IN_SIZE = 500
+# Слева не буква и не «&»: в экранированном тексте есть «&#x27;».
+TAG_RE = re.compile(r"(?<![\w&#])#(\w+)")
+MENTION_RE = re.compile(r"(?<![\w&@])@(\w[\w.+-]*)")
+
+
+def extract_tags(text):
+    """Имена тегов в нижнем регистре, без повторов, по порядку."""
+    names = (name.lower() for name in TAG_RE.findall(text))
+    return list(dict.fromkeys(
+        name for name in names if len(name) <= TAG_LENGTH
+    ))
+
+
+def _username(match):
+    # Точка в конце — конец предложения, а не часть имени.
+    return match[1].rstrip(".")
+
+
+def extract_mentions(text):
+    return list(dict.fromkeys(
+        _username(match) for match in MENTION_RE.finditer(text)
+    ))
+
+
+def existing_usernames(texts):
+    """Имена из упоминаний в texts, под которыми есть пользователи."""
+    names = list({name for text in texts for name in extract_mentions(text)})
+    users = get_user_model().objects
+    found = set()
+    for start in range(0, len(names), IN_SIZE):
+        found.update(users.filter(
+            username__in=names[start:start + IN_SIZE]
+        ).values_list("username", flat=True))
+    return found
+
+
+def line_breaks(html):
+    """Как фильтр linebreaksbr."""
+    return normalize_newlines(html).replace("\n", "<br>")
+
+
+def link_tags(html):
+    def link(match):
+        name = match[1].lower()
+        if len(name) > TAG_LENGTH:
+            return match[0]
+        return f'<a href="{reverse("tag", args=[name])}">{match[0]}</a>'
+    return TAG_RE.sub(link, html)
+
+
+def link_mentions(html, usernames):
+    def link(match):
+        username = _username(match)
+        if username not in usernames:
+            return match[0]
+        url = reverse("profile", args=[username])
+        tail = match[0][len(username) + 1:]
+        return f'<a href="{url}">@{username}</a>{tail}'
+    return MENTION_RE.sub(link, html)
+
+
+def render_text(text, tags=True, usernames=frozenset()):
+    """HTML текста: ссылки на теги, если tags, и на упоминания
+    пользователей из usernames."""
+    html = line_breaks(escape(text))
+    if tags:
+        html = link_tags(html)
+    if usernames:
+        html = link_mentions(html, usernames)
+    return str(html)
@@ -0,0 +1,180 @@
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+
+WORD_RE = re.compile(r"\w+")
+
+
+class SearchBackend:
+    """Интерфейс поискового индекса по постам и комментариям.
+
+    ``search`` возвращает пары (оценка, id поста) в порядке выдачи,
+    лучшие совпадения первыми. Курсоры ``after``/``before`` — такие же
+    пары из предыдущей выдачи.
+    """
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def search(self, query, limit, after=None, before=None):
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=1000):
+        return 0
+
+
+class SimpleBackend(SearchBackend):
+    """Поиск без индекса подстрокой; подходит для любой СУБД."""
+
+    def search(self, query, limit, after=None, before=None):
+        words = WORD_RE.findall(query)
+        if not words:
+            return []
+        posts = Post.objects.all()
+        for word in words:
+            posts = posts.filter(
+                Q(text__icontains=word) | Q(comments__text__icontains=word)
+            )
+        # Оценка у всех совпадений одна, порядок — от новых постов.
+        posts = posts.distinct().values_list("pk", flat=True)
+        if after is not None:
+            rows = posts.filter(pk__lt=after[1]).order_by("-pk")[:limit]
+        elif before is not None:
+            rows = posts.filter(pk__gt=before[1]).order_by("pk")[:limit]
+            rows = list(rows)[::-1]
+        else:
+            rows = posts.order_by("-pk")[:limit]
+        return [(0.0, pk) for pk in rows]
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Инвертированный индекс на SQLite FTS5.
+
+    Пост и каждый его комментарий — отдельные документы таблицы
+    posts_search; rowid кодирует вид документа, чтобы менять и удалять
+    их по первичному ключу.
+    """
+
+    table = "posts_search"
+
+    @staticmethod
+    def post_rowid(post_id):
+        return post_id * 2
+
+    @staticmethod
+    def comment_rowid(comment_id):
+        return comment_id * 2 + 1
+
+    def _replace(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(rowid, text, post_id) VALUES (%s, %s, %s)",
+                rows,
+            )
+
+    def _delete(self, rowid):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [rowid]
+            )
+
+    def index_post(self, post):
+        self._replace([(self.post_rowid(post.pk), post.text, post.pk)])
+
+    def remove_post(self, post_id):
+        self._delete(self.post_rowid(post_id))
+
+    def index_comment(self, comment):
+        if comment.post_id:
+            rowid = self.comment_rowid(comment.pk)
+            self._replace([(rowid, comment.text, comment.post_id)])
+
+    def remove_comment(self, comment_id):
+        self._delete(self.comment_rowid(comment_id))
+
+    @staticmethod
+    def match_expression(query):
+        # Слова берем в кавычки, чтобы пользовательский ввод не
+        # разбирался как синтаксис FTS5; * — поиск по префиксу.
+        return " ".join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+    def search(self, query, limit, after=None, before=None):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        sql = (
+            f"SELECT MIN(rank) AS score, post_id FROM {self.table} "
+            f"WHERE {self.table} MATCH %s GROUP BY post_id"
+        )
+        params = [expression]
+        order = "score, post_id"
+        if after is not None:
+            sql += " HAVING score > %s OR (score = %s AND post_id > %s)"
+            params += [after[0], after[0], after[1]]
+        elif before is not None:
+            sql += " HAVING score < %s OR (score = %s AND post_id < %s)"
+            params += [before[0], before[0], before[1]]
+            order = "score DESC, post_id DESC"
+        sql += f" ORDER BY {order} LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = [(score, post_id) for score, post_id in cursor.fetchall()]
+        return rows[::-1] if before is not None else rows
+
+    def _batches(self, queryset, fields, batch_size):
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk).order_by(
+                "pk"
+            ).values_list(*fields)[:batch_size])
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1][0]
+
+    def rebuild(self, batch_size=1000):
+        """Переиндексирует все посты и комментарии пачками."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+        amount = 0
+        posts = Post.objects.all()
+        for batch in self._batches(posts, ("pk", "text"), batch_size):
+            with transaction.atomic():
+                self._replace([
+                    (self.post_rowid(pk), text, pk) for pk, text in batch
+                ])
+            amount += len(batch)
+        comments = Comment.objects.filter(post__isnull=False)
+        fields = ("pk", "text", "post_id")
+        for batch in self._batches(comments, fields, batch_size):
+            with transaction.atomic():
+                self._replace([
+                    (self.comment_rowid(pk), text, post_id)
+                    for pk, text, post_id in batch
+                ])
+            amount += len(batch)
+        return amount
+
+
+def get_backend():
+    if settings.SEARCH_BACKEND:
+        return import_string(settings.SEARCH_BACKEND)()
+    if connection.vendor == "sqlite":
+        return SQLiteFTSBackend()
+    return SimpleBackend()
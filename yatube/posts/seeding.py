@@ -0,0 +1,382 @@
+"""Массовая загрузка данных: синтетических или из файлов JSONL/CSV.
+
+Записи вставляются через bulk_create пачками, каждая в своей
+транзакции, с отключенными сигналами; счетчики, ленты подписок и
+поисковый индекс пересчитываются в конце одним проходом.
+"""
+import csv
+import json
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import hashtags, timeline, trending
+from .cache import bump_feed_version
+from .counters import rebuild_comment_counts, rebuild_user_stats
+from .models import Comment, Follow, Group, Post, User
+from .search import get_backend
+from .signals import suspended
+
+BATCH_SIZE = 5000
+# Объем синтетических данных по умолчанию.
+USERS = 100_000
+POSTS = 10_000_000
+COMMENTS = 5_000_000
+GROUPS = 100
+FOLLOWS = 20
+PERIOD = timedelta(days=365)
+WORDS = (
+    "кот", "пес", "утро", "вечер", "море", "город", "книга", "лето",
+    "зима", "дорога", "песня", "друг", "дом", "небо", "сад", "река",
+    "поезд", "кофе", "чай", "код", "сервер", "запрос", "лента", "снег",
+)
+
+
+@contextmanager
+def keep_dates(*fields):
+    """Отключает auto_now_add, чтобы сохранить сгенерированные даты."""
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+@contextmanager
+def bulk_loading():
+    """Даты из данных, а не время вставки, и никаких сигналов."""
+    pub_date = Post._meta.get_field("pub_date")
+    created = Comment._meta.get_field("created")
+    with keep_dates(pub_date, created), suspended():
+        yield
+
+
+def rebuild_derived(batch_size=BATCH_SIZE):
+    """Пересчитывает все, что обычно поддерживают сигналы."""
+    rebuild_user_stats()
+    rebuild_comment_counts()
+    timeline.rebuild()
+    hashtags.rebuild(batch_size=batch_size)
+    trending.rebuild()
+    get_backend().rebuild(batch_size=batch_size)
+    bump_feed_version()
+
+
+class PowerLaw:
+    """Выбор из ids с весом 1 / rank ** exponent: первые — самые
+    популярные."""
+
+    def __init__(self, ids, rng, exponent=1.0):
+        self.ids = ids
+        self.rng = rng
+        self.weights = list(accumulate(
+            1 / (rank + 1) ** exponent for rank in range(len(ids))
+        ))
+
+    def pick(self, amount=1):
+        return self.rng.choices(self.ids, cum_weights=self.weights, k=amount)
+
+
+class Seeder:
+    """Генератор синтетических данных: популярность авторов и число
+    подписчиков распределены по степенному закону."""
+
+    def __init__(self, users=USERS, posts=POSTS, comments=COMMENTS,
+                 groups=GROUPS, follows=FOLLOWS, random_seed=0,
+                 prefix="seed", batch_size=BATCH_SIZE, log=None):
+        self.users = users
+        self.posts = posts
+        self.comments = comments
+        self.groups = groups
+        self.follows = follows
+        self.rng = random.Random(random_seed)
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+
+    def text(self, words):
+        return " ".join(self.rng.choices(WORDS, k=words)).capitalize()
+
+    def date(self):
+        return self.now - PERIOD * self.rng.random()
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def create_users(self):
+        password = make_password(None)
+        for batch in self.batches(self.users):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(username=f"{self.prefix}{number}", password=password)
+                    for number in batch
+                ])
+        return list(User.objects.filter(
+            username__startswith=self.prefix
+        ).order_by("pk").values_list("pk", flat=True))
+
+    def create_groups(self):
+        Group.objects.bulk_create([
+            Group(
+                title=f"Группа {number}",
+                slug=f"{self.prefix}-{number}",
+                description=self.text(10),
+            )
+            for number in range(self.groups)
+        ])
+        return list(Group.objects.filter(
+            slug__startswith=f"{self.prefix}-"
+        ).values_list("pk", flat=True))
+
+    def create_follows(self, user_ids, authors):
+        amount = 0
+        for batch in self.batches(len(user_ids)):
+            follows = []
+            for user_id in user_ids[batch.start:batch.stop]:
+                wanted = round(self.rng.expovariate(1 / self.follows))
+                targets = set(authors.pick(wanted)) - {user_id}
+                follows.extend(
+                    Follow(user_id=user_id, author_id=author_id)
+                    for author_id in targets
+                )
+            with transaction.atomic():
+                Follow.objects.bulk_create(follows, ignore_conflicts=True)
+            amount += len(follows)
+        return amount
+
+    def create_posts(self, authors, group_ids):
+        """Посты и комментарии к ним; комментарии создаются сразу за
+        своей пачкой постов, чтобы не держать в памяти все id."""
+        comment_rate = self.comments / self.posts if self.posts else 0
+        amount = 0
+        for batch in self.batches(self.posts):
+            with transaction.atomic():
+                amount += self._create_batch(
+                    len(batch), authors, group_ids, comment_rate
+                )
+            self.log(f"Постов: {batch.stop} из {self.posts}")
+        return amount
+
+    def _create_batch(self, size, authors, group_ids, comment_rate):
+        posts = [
+            Post(
+                text=self.text(self.rng.randint(5, 40)),
+                author_id=author_id,
+                group_id=(
+                    self.rng.choice(group_ids)
+                    if group_ids and self.rng.random() < 0.7 else None
+                ),
+                pub_date=self.date(),
+            )
+            for author_id in authors.pick(size)
+        ]
+        Post.objects.bulk_create(posts)
+        # SQLite не возвращает id из bulk_create: берем последние.
+        created = Post.objects.order_by("-pk").values_list(
+            "pk", "pub_date"
+        )[:size]
+        comments = []
+        for post_id, pub_date in created:
+            for _ in range(round(self.rng.expovariate(1) * comment_rate)):
+                comments.append(Comment(
+                    post_id=post_id,
+                    author_id=self.rng.choice(authors.ids),
+                    text=self.text(self.rng.randint(3, 20)),
+                    created=min(
+                        pub_date + PERIOD * self.rng.random() / 12, self.now
+                    ),
+                ))
+        Comment.objects.bulk_create(comments)
+        return len(comments)
+
+    def run(self):
+        """Заполняет базу и возвращает число созданных записей."""
+        with bulk_loading():
+            user_ids = self.create_users()
+            group_ids = self.create_groups()
+            authors = PowerLaw(user_ids, self.rng)
+            self.log(f"Пользователей: {len(user_ids)}")
+            follows = self.create_follows(user_ids, authors)
+            self.log(f"Подписок: {follows}")
+            comments = self.create_posts(authors, group_ids)
+        self.log("Пересчет счетчиков, лент и поискового индекса")
+        rebuild_derived(self.batch_size)
+        return {
+            "users": len(user_ids),
+            "groups": len(group_ids),
+            "follows": follows,
+            "posts": self.posts,
+            "comments": comments,
+        }
+
+
+LOAD_ORDER = ("users", "groups", "posts", "comments", "follows")
+
+
+def read_records(path):
+    """Построчно читает JSONL или CSV, не загружая файл в память."""
+    with open(path, newline="", encoding="utf-8") as source:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(source)
+            return
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def file_kind(path):
+    """Вид записей по имени файла: posts.jsonl, users.csv и т. п."""
+    kind = os.path.basename(path).split(".")[0]
+    if kind not in LOAD_ORDER:
+        raise ValueError(
+            f"{path}: имя файла должно начинаться с одного из "
+            f"{', '.join(LOAD_ORDER)}"
+        )
+    return kind
+
+
+def chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Importer:
+    """Загрузка записей из файлов.
+
+    Пользователи и авторы задаются именем, группы — slug, посты —
+    id; дата без часового пояса считается UTC, пустая — текущей.
+    """
+
+    models = {
+        "users": User,
+        "groups": Group,
+        "posts": Post,
+        "comments": Comment,
+        "follows": Follow,
+    }
+
+    def __init__(self, batch_size=BATCH_SIZE, log=None):
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.password = make_password(None)
+        self._users = None
+        self._groups = None
+
+    def user_id(self, username):
+        if self._users is None:
+            self._users = dict(User.objects.values_list("username", "pk"))
+        try:
+            return self._users[username]
+        except KeyError:
+            raise ValueError(f"Нет пользователя {username}")
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        if self._groups is None:
+            self._groups = dict(Group.objects.values_list("slug", "pk"))
+        try:
+            return self._groups[slug]
+        except KeyError:
+            raise ValueError(f"Нет группы {slug}")
+
+    @staticmethod
+    def date(value):
+        if not value:
+            return timezone.now()
+        date = parse_datetime(value)
+        if date is None:
+            raise ValueError(f"Неверная дата {value}")
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date, timezone.utc)
+        return date
+
+    def build_users(self, record):
+        return User(
+            username=record["username"],
+            email=record.get("email", ""),
+            first_name=record.get("first_name", ""),
+            last_name=record.get("last_name", ""),
+            password=self.password,
+        )
+
+    def build_groups(self, record):
+        return Group(
+            title=record["title"],
+            slug=record["slug"],
+            description=record.get("description", ""),
+        )
+
+    def build_posts(self, record):
+        return Post(
+            pk=record.get("id") or None,
+            text=record["text"],
+            author_id=self.user_id(record["author"]),
+            group_id=self.group_id(record.get("group")),
+            pub_date=self.date(record.get("pub_date")),
+        )
+
+    def build_comments(self, record):
+        return Comment(
+            post_id=record["post"],
+            author_id=self.user_id(record["author"]),
+            text=record["text"],
+            created=self.date(record.get("created")),
+        )
+
+    def build_follows(self, record):
+        return Follow(
+            user_id=self.user_id(record["user"]),
+            author_id=self.user_id(record["author"]),
+        )
+
+    def load(self, kind, path):
+        model = self.models[kind]
+        build = getattr(self, f"build_{kind}")
+        amount = 0
+        for chunk in chunks(read_records(path), self.batch_size):
+            objects = [build(record) for record in chunk]
+            with transaction.atomic():
+                model.objects.bulk_create(objects, ignore_conflicts=True)
+            amount += len(objects)
+            self.log(f"{path}: {amount}")
+        # Новые пользователи и группы видны следующим файлам.
+        self._users = self._groups = None
+        return amount
+
+    def run(self, paths):
+        """Загружает файлы в порядке зависимостей и пересчитывает
+        производные данные."""
+        files = sorted(
+            ((file_kind(path), path) for path in paths),
+            key=lambda item: LOAD_ORDER.index(item[0]),
+        )
+        loaded = {}
+        with bulk_loading():
+            for kind, path in files:
+                loaded[kind] = loaded.get(kind, 0) + self.load(kind, path)
+        # Посты могли прийти с явными id: сдвигаем последовательности.
+        models = [self.models[kind] for kind in loaded]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        self.log("Пересчет счетчиков, лент и поискового индекса")
+        rebuild_derived(self.batch_size)
+        return loaded
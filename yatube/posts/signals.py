@@ -0,0 +1,190 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .cache import (bump_author_version, bump_feed_version,
+                    invalidate_comments, invalidate_following)
+from .counters import change_comment_count, change_user_stats
+from .hashtags import index_post as index_hashtags
+from .models import Comment, Follow, Post, User, UserStats
+from .search import get_backend
+from .timeline import backfill, fan_out, prune, stop_fanout
+from .trending import add_activity
+
+_connected = []
+
+
+def receiver(signal, sender):
+    """Как django.dispatch.receiver, но запоминает подключение, чтобы
+    suspended() мог его снять."""
+    def decorator(func):
+        signal.connect(func, sender=sender)
+        _connected.append((signal, func, sender))
+        return func
+    return decorator
+
+
+@contextmanager
+def suspended():
+    """Отключает обработчики на время массовой загрузки; производные
+    данные после нее пересчитываются целиком."""
+    for signal, func, sender in _connected:
+        signal.disconnect(func, sender=sender)
+    try:
+        yield
+    finally:
+        for signal, func, sender in _connected:
+            signal.connect(func, sender=sender)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feed(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    change_user_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id:
+        change_comment_count(instance.post_id, 1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_activity(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.post_id:
+        add_activity({instance.post_id: 1}, "comments")
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    if instance.post_id:
+        change_comment_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_user_stats(instance.user_id, following_count=1)
+        change_user_stats(instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    change_user_stats(instance.user_id, following_count=-1)
+    change_user_stats(instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def push_to_timelines(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # Счетчики уже увеличил count_new_follow.
+        stop_fanout(instance.author_id)
+        backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def index_tags(sender, instance, created, raw=False, update_fields=None,
+               **kwargs):
+    if not raw and (update_fields is None or "text" in update_fields):
+        index_hashtags(instance, created)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    get_backend().remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_following(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _now_and_on_commit(invalidate_following, instance.user_id)
+
+
+def _now_and_on_commit(func, *args):
+    # Сбрасываем кеш и сразу, и после коммита: иначе параллельный
+    # запрос успеет закешировать данные, которые транзакция еще не
+    # записала.
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+def _bump_authors(*author_ids):
+    _now_and_on_commit(bump_author_version, *author_ids)
+
+
+@receiver(post_save, sender=User)
+def reset_author_card(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bump_authors(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def reset_post_author_card(sender, instance, created=True, raw=False,
+                           **kwargs):
+    # Правка поста счетчики автора не меняет.
+    if created and not raw:
+        _bump_authors(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def reset_follow_cards(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bump_authors(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reset_comments_page(sender, instance, raw=False, **kwargs):
+    if not raw and instance.post_id:
+        _now_and_on_commit(invalidate_comments, instance.post_id)
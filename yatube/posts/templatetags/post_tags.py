@@ -0,0 +1,28 @@
+from django import template
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from yatube.metrics import record_cache
+
+from ..cache import POST_ITEM_TIMEOUT, post_item_key
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_item(context, post):
+    """includes/post_item.html с кешем на каждый пост.
+
+    Автор видит в карточке кнопку правки, поэтому для него свой вариант.
+    """
+    user = context.get("user")
+    is_author = bool(user and user.pk == post.author_id)
+    key = post_item_key(post, is_author)
+    html = cache.get(key)
+    record_cache(html is not None)
+    if html is None:
+        item = context.template.engine.get_template("includes/post_item.html")
+        with context.push(post=post):
+            html = item.render(context)
+        cache.set(key, html, POST_ITEM_TIMEOUT)
+    return mark_safe(html)
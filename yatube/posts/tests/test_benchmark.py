@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..benchmark import VIEWS, percentile
+from ..models import Comment, Follow, Post, TimelineEntry, UserStats
+
+
+class BenchmarkTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.output = os.path.join(directory, "benchmark.json")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+
+    def test_seed_and_measure(self):
+        call_command(
+            "benchmark", seed=True, users=30, posts=300, comments=100,
+            groups=3, follows=5, iterations=3, output=self.output,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertTrue(Comment.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        # Счетчики пересчитаны после bulk_create без сигналов.
+        self.assertEqual(
+            sum(UserStats.objects.values_list("posts_count", flat=True)),
+            300,
+        )
+        # Даты публикации разнесены, а не равны времени вставки.
+        self.assertGreater(
+            Post.objects.values("pub_date").distinct().count(), 1
+        )
+        with open(self.output) as source:
+            results = json.load(source)
+        self.assertEqual(results["dataset"]["posts"], 300)
+        self.assertEqual(set(results["views"]), set(VIEWS))
+        for data in results["views"].values():
+            self.assertEqual(data["requests"], 3)
+            self.assertGreater(data["queries_max"], 0)
+            self.assertLessEqual(data["p50_ms"], data["p99_ms"])
@@ -0,0 +1,76 @@
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..export import export_lines, iter_posts
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.other = User.objects.create_user(username="other")
+        cls.posts = [
+            Post.objects.create(text=f"Текст {i}", author=cls.author)
+            for i in range(5)
+        ]
+        Post.objects.create(text="Чужой пост", author=cls.other)
+        for post in cls.posts[1:3]:
+            Comment.objects.create(post=post, author=cls.other, text="Ок")
+
+    def test_iter_posts_batches(self):
+        with self.assertNumQueries(6):
+            items = [
+                (post, list(comments)) for post, comments in iter_posts(
+                    Post.objects.filter(author=self.author), batch_size=2
+                )
+            ]
+        self.assertEqual([post for post, _ in items], self.posts)
+        self.assertEqual(
+            [len(comments) for _, comments in items], [0, 1, 1, 0, 0]
+        )
+
+    def test_ndjson_streams_comments(self):
+        post = self.posts[4]
+        for i in range(5):
+            Comment.objects.create(post=post, author=self.other, text=f"{i}")
+        lines = "".join(export_lines(
+            Post.objects.filter(pk__gte=post.pk), "ndjson", batch_size=2
+        )).splitlines()
+        records = [json.loads(line) for line in lines]
+        self.assertEqual([record["id"] for record in records], [
+            post.pk, post.pk + 1
+        ])
+        self.assertEqual(
+            [comment["text"] for comment in records[0]["comments"]],
+            ["0", "1", "2", "3", "4"],
+        )
+        self.assertEqual(records[1]["comments"], [])
+
+    def test_command_gzip_file(self):
+        path = os.path.join(tempfile.mkdtemp(), "author.ndjson.gz")
+        call_command("export", author="author", output=path)
+        with gzip.open(path, "rt", encoding="utf-8") as source:
+            records = [json.loads(line) for line in source]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[1]["comments"][0]["author"], "other")
+
+    def test_command_stdout(self):
+        output = StringIO()
+        call_command("export", format="csv", stdout=output)
+        # Заголовок, 6 постов и 2 комментария.
+        self.assertEqual(len(output.getvalue().splitlines()), 9)
+
+    def test_unknown_author(self):
+        with self.assertRaises(CommandError):
+            call_command("export", author="nobody", stdout=StringIO())
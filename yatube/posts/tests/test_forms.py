@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -8,8 +9,12 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from urllib.parse import quote
+from PIL import Image
 
+from .. forms import PostForm
+from .. images import draft_size
 from .. models import Comment, Group, Post
+from .. thumbnails import render_thumbnails
 
 TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
 User = get_user_model()
@@ -119,9 +124,11 @@ class CreateFormTests(TestCase):
             data=form_data,
             follow=True
         )
-        second_post = Post.objects.get(
-            text=form_data["text"],
-            image="posts/small.jpeg"
+        second_post = Post.objects.get(text=form_data["text"])
+        # Картинка сохраняется перекодированной, под именем по хешу
+        self.assertEqual(
+            second_post.image.name,
+            f"posts/{second_post.image_hash}.webp"
         )
         pages_list = [
             reverse("index"),
@@ -151,6 +158,92 @@ class CreateFormTests(TestCase):
                         test_response.context["page"][0].image
                     )
 
+    def test_thumbnails_are_prerendered(self):
+        """Миниатюры готовятся заранее, шаблон берет их адреса из поста."""
+        small_image = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        post = Post.objects.create(
+            text="Post with thumbnails",
+            author=self.user,
+            image=SimpleUploadedFile("thumb.gif", small_image, "image/gif"),
+        )
+        render_thumbnails(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_url)
+        self.assertEqual(len(post.thumbnail_srcset.split(", ")), 3)
+        response = self.guest_client.get(reverse("post", kwargs={
+            "username": self.user,
+            "post_id": post.pk,
+        }))
+        self.assertContains(response, post.thumbnail_url)
+
+    def get_image_file(self, name, size=(50, 50), exif=None):
+        file_obj = BytesIO()
+        Image.new("RGB", size=size, color=(255, 0, 0)).save(
+            file_obj, "JPEG", exif=exif or b""
+        )
+        return SimpleUploadedFile(name, file_obj.getvalue(), "image/jpeg")
+
+    @override_settings(POST_IMAGE_MAX_WIDTH=100)
+    def test_image_is_normalized(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        form = PostForm(
+            data={"text": "Photo"},
+            files={"image": self.get_image_file("big.jpg", (400, 200), exif)},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save(commit=False)
+        post.author = self.user
+        post.save()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.size, (100, 50))
+            self.assertFalse(image.getexif())
+
+    def test_jpeg_is_shrunk_while_decoding(self):
+        rotated = Image.Exif()
+        rotated[0x0112] = 6
+        cases = [
+            ((400, 200), None, (100, 50)),
+            ((200, 400), rotated, (50, 100)),
+        ]
+        for size, exif, drafted in cases:
+            with self.subTest(size=size):
+                upload = self.get_image_file("big.jpg", size, exif)
+                with Image.open(upload) as image:
+                    image.draft("RGB", draft_size(image, 100))
+                    self.assertEqual(image.size, drafted)
+
+    def test_identical_images_are_stored_once(self):
+        names = []
+        for text in ("First", "Second"):
+            form = PostForm(
+                data={"text": text},
+                files={"image": self.get_image_file("same.jpg")},
+            )
+            self.assertTrue(form.is_valid(), form.errors)
+            post = form.save(commit=False)
+            post.author = self.user
+            post.save()
+            names.append(post.image.name)
+        self.assertEqual(names[0], names[1])
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_image_pixel_limit(self):
+        form = PostForm(
+            data={"text": "Huge photo"},
+            files={"image": self.get_image_file("huge.jpg", (20, 20))},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
     def test_add_comment_authorized_client(self):
         form_data = {
             "post": CreateFormTests.test_post.pk,
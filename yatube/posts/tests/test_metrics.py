@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from yatube.metrics import registry
+
+from .. models import Post
+
+User = get_user_model()
+
+
+class MetricsMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        Post.objects.create(text="Тестовый текст", author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        response = self.guest_client.get(reverse("index"))
+        timing = response["Server-Timing"]
+        self.assertIn('db;dur=', timing)
+        # Версия ленты и посты.
+        self.assertIn('desc="2 queries"', timing)
+        self.assertIn("tpl;dur=", timing)
+        # Промах кеша ленты и промах фрагмента единственного поста.
+        self.assertIn('cache;desc="hit=0 miss=2"', timing)
+
+    def test_metrics_endpoint(self):
+        self.guest_client.get(reverse("index"))
+        self.guest_client.get(reverse("index"))
+        self.guest_client.get(reverse("profile", kwargs={
+            "username": self.user
+        }))
+        response = self.guest_client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('yatube_requests_total{view="index"} 2', content)
+        self.assertIn('yatube_requests_total{view="profile"} 1', content)
+        self.assertIn('yatube_cache_hits_total{view="index"} 1', content)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket{view="index",le="+Inf"} 2',
+            content
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="index"} 2', content
+        )
+        # Одна гистограмма: корзины, сумма и число под одним TYPE.
+        self.assertIn(
+            "# TYPE yatube_request_duration_seconds histogram", content
+        )
+        self.assertNotIn("_sum counter", content)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_endpoint_is_private(self):
+        response = self.guest_client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_with_sql(self):
+        with self.assertLogs("yatube.metrics", "WARNING") as logs:
+            self.guest_client.get(reverse("index"))
+        self.assertIn("posts_post", logs.output[0])
@@ -1,7 +1,16 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from .. models import Group, Post
+from .. models import Comment, Follow, Group, Post, UserStats
+from ..paginators import CommentPaginator, KeysetPaginator, encode_cursor
+from ..timeline import timeline_paginator
 
 User = get_user_model()
 
@@ -35,3 +44,152 @@ class GroupModelTest(TestCase):
         group = GroupModelTest.group_1
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        post = Post.objects.create(text="Тестовый текст", author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Комментарий"
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_rebuild_counters_command(self):
+        post = Post.objects.create(text="Тестовый текст", author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text="Текст")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.update(comment_count=0)
+        UserStats.objects.all().delete()
+        call_command("rebuild_counters", stdout=StringIO())
+        post.refresh_from_db()
+        stats = self.stats(self.author)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(stats.following_count, 0)
+
+    def test_rebuild_many_missing_stats(self):
+        # SQLite принимает не больше 500 строк в одном INSERT.
+        User.objects.bulk_create([
+            User(username=f"user{i}") for i in range(600)
+        ])
+        call_command("rebuild_counters", stdout=StringIO())
+        self.assertEqual(UserStats.objects.count(), 602)
+
+
+class FeedIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовый заголовок",
+            description="Тестовое описание",
+            slug="group-slug"
+        )
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.reader, author=self.user)
+
+    def plans(self, make_paginator, params=""):
+        """Планы запросов, которые пагинатор выполнил для страницы."""
+        with CaptureQueriesContext(connection) as context:
+            make_paginator().get_page(QueryDict(params))
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                yield " ".join(str(row[-1]) for row in cursor.fetchall())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_feed_queries_use_indexes(self):
+        """Ленты читаются по индексу, без сортировки во временном дереве."""
+        if connection.vendor != "sqlite":
+            self.skipTest("План запроса проверяется только для SQLite")
+        popular = User.objects.create_user(username="popular")
+        for user in (self.reader, self.user):
+            Follow.objects.create(user=user, author=popular)
+        Follow.objects.create(user=self.reader, author=self.user)
+        post = Post.objects.create(text="Текст", author=self.user)
+        Comment.objects.create(post=post, author=self.reader, text="Hi")
+        after = "after=" + encode_cursor(timezone.now().isoformat(), 10 ** 6)
+        feeds = {
+            "index": lambda: KeysetPaginator(Post.objects.feed(), 10),
+            "profile": lambda: KeysetPaginator(
+                Post.objects.feed().filter(author=self.user), 10
+            ),
+            "group": lambda: KeysetPaginator(
+                Post.objects.feed().filter(group=self.group), 10
+            ),
+            "comments": lambda: CommentPaginator(
+                post.comments.select_related("author"), 20
+            ),
+            "follow": lambda: timeline_paginator(self.reader, 10),
+        }
+        for name, make_paginator in feeds.items():
+            for params in ("", after):
+                plans = list(self.plans(make_paginator, params))
+                self.assertTrue(plans)
+                for plan in plans:
+                    with self.subTest(feed=name, params=params, plan=plan):
+                        self.assertIn("USING", plan)
+                        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class RenderedTextTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author")
+
+    def test_html_is_rendered_on_save(self):
+        post = Post.objects.create(
+            text="<b>Жирный</b>\nвторая строка", author=self.author
+        )
+        expected = "&lt;b&gt;Жирный&lt;/b&gt;<br>вторая строка"
+        self.assertEqual(post.text_html, expected)
+        post.text = "Новый\r\nтекст"
+        post.save(update_fields=["text"])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, "Новый<br>текст")
+        comments = Comment.objects.bulk_create([
+            Comment(post=post, author=self.author, text="a & b"),
+        ])
+        self.assertEqual(comments[0].text_html, "a &amp; b")
+
+    def test_backfill_command(self):
+        post = Post.objects.create(text="Первая\nвторая", author=self.author)
+        Comment.objects.create(post=post, author=self.author, text="<i>")
+        Post.objects.update(text_html="")
+        Comment.objects.update(text_html="")
+        self.assertEqual(post.html, "Первая<br>вторая")
+        call_command("render_text", batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.values_list("text_html", flat=True)),
+            ["Первая<br>вторая"],
+        )
+        self.assertEqual(
+            list(Comment.objects.values_list("text_html", flat=True)),
+            ["&lt;i&gt;"],
+        )
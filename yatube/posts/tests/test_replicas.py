@@ -0,0 +1,112 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, router, transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from yatube.replicas import PIN_COOKIE, replica_reads
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class ReplicaRoutingTest(TestCase):
+    """Основная база и реплика — два разных SQLite-файла; реплика
+    нарочно отстает, чтобы было видно, откуда читает страница."""
+
+    databases = {"default", "replica"}
+
+    @classmethod
+    def setUpClass(cls):
+        path = os.path.join(tempfile.mkdtemp(), "replica.sqlite3")
+        connections.databases["replica"] = {
+            "ENGINE": "yatube.sqlite3",
+            "NAME": path,
+            "TEST": {"NAME": path},
+        }
+        call_command("migrate", database="replica", verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.databases["replica"]
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        Post.objects.create(text="Пост в основной базе", author=self.author)
+        User.objects.using("replica").bulk_create([
+            User(pk=self.author.pk, username="author")
+        ])
+        Post.objects.using("replica").bulk_create([
+            Post(text="Пост на реплике", author_id=self.author.pk)
+        ])
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def index_texts(self):
+        response = self.client.get(reverse("index"))
+        return [post.text for post in response.context["page"]]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.index_texts(), ["Пост на реплике"])
+
+    def test_writer_is_pinned_to_primary(self):
+        response = self.client.post(
+            reverse("new_post"), {"text": "Новый пост"}, follow=True
+        )
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+        self.assertEqual(
+            [post.text for post in response.context["page"]],
+            ["Новый пост", "Пост в основной базе"],
+        )
+        self.assertFalse(
+            Post.objects.using("replica").filter(text="Новый пост").exists()
+        )
+
+    def test_get_write_pins_to_primary(self):
+        reader = User.objects.create_user(username="reader")
+        User.objects.using("replica").bulk_create([
+            User(pk=reader.pk, username="reader", password=reader.password)
+        ])
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse("profile_follow", kwargs={"username": "author"})
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(
+            reverse("profile", kwargs={"username": "author"})
+        )
+        self.assertTrue(response.context["following"])
+        # Чтение без записи не закрепляет клиента.
+        response = self.client.get(reverse("index"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_card_stats_created_on_primary(self):
+        # На реплике у автора еще нет строки счетчиков.
+        response = Client().get(
+            reverse("profile", kwargs={"username": "author"})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["post_amt"], 1)
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_pin_expires(self):
+        self.client.post(reverse("new_post"), {"text": "Новый пост"})
+        self.assertEqual(self.index_texts(), ["Пост на реплике"])
+
+    def test_transaction_reads_primary(self):
+        self.assertEqual(router.db_for_read(Post), "default")
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Post), "replica")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), "default")
+            self.assertEqual(router.db_for_write(Post), "default")
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from ..models import (Comment, Follow, Group, Post, PostTag, TimelineEntry,
+                      User)
+from ..search import get_backend
+
+
+class SeedCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(content)
+        return path
+
+    def write_jsonl(self, name, records):
+        return self.write(name, "".join(
+            json.dumps(record, ensure_ascii=False) + "\n"
+            for record in records
+        ))
+
+    def seed(self, *files):
+        call_command("seed", *files, batch_size=2, stdout=StringIO())
+
+    def test_import_files(self):
+        users = self.write(
+            "users.csv", "username,first_name\nleo,Лев\nanna,Анна\n"
+        )
+        groups = self.write_jsonl("groups.jsonl", [
+            {"title": "Котики", "slug": "cats", "description": "Про котов"},
+        ])
+        posts = self.write_jsonl("posts.jsonl", [
+            {"id": 10, "text": "Пост про котиков", "author": "leo",
+             "group": "cats", "pub_date": "2020-01-01T10:00:00"},
+            {"id": 11, "text": "Еще пост", "author": "leo",
+             "pub_date": "2020-01-02T10:00:00+00:00"},
+            {"id": 12, "text": "Пост Анны", "author": "anna"},
+        ])
+        comments = self.write_jsonl("comments.jsonl", [
+            {"post": 10, "author": "anna", "text": "Мурлыкает"},
+        ])
+        follows = self.write_jsonl("follows.jsonl", [
+            {"user": "anna", "author": "leo"},
+        ])
+        # Порядок файлов не важен: загружаются по зависимостям.
+        self.seed(follows, comments, posts, groups, users)
+
+        leo = User.objects.get(username="leo")
+        anna = User.objects.get(username="anna")
+        self.assertEqual(leo.first_name, "Лев")
+        self.assertFalse(leo.has_usable_password())
+        post = Post.objects.get(pk=10)
+        self.assertEqual(post.group, Group.objects.get(slug="cats"))
+        self.assertEqual(
+            post.pub_date.isoformat(), "2020-01-01T10:00:00+00:00"
+        )
+        self.assertEqual(post.comment_count, 1)
+        self.assertTrue(Follow.objects.filter(user=anna, author=leo).exists())
+        self.assertEqual(leo.stats.posts_count, 2)
+        self.assertEqual(leo.stats.followers_count, 1)
+        self.assertEqual(anna.stats.following_count, 1)
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=anna).values_list(
+                "post_id", flat=True
+            )),
+            {10, 11},
+        )
+        found = [post_id for _, post_id in get_backend().search("мурлык", 5)]
+        self.assertEqual(found, [10])
+
+    def test_signals_restored(self):
+        self.seed(self.write("users.csv", "username\nleo\n"))
+        author = User.objects.get(username="leo")
+        Post.objects.create(text="Новый пост", author=author)
+        author.stats.refresh_from_db()
+        self.assertEqual(author.stats.posts_count, 1)
+
+    def test_unknown_author(self):
+        users = self.write("users.csv", "username\nleo\n")
+        comments = self.write_jsonl("comments.jsonl", [
+            {"post": 1, "author": "ghost", "text": "Бу"},
+        ])
+        with self.assertRaises(CommandError):
+            self.seed(users, comments)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_unknown_file(self):
+        with self.assertRaises(CommandError):
+            self.seed(self.write("likes.jsonl", "{}\n"))
+
+    def test_generate(self):
+        call_command(
+            "seed", users=10, posts=50, comments=20, groups=2, follows=3,
+            stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Post.objects.count(), 50)
+
+    def test_batches_over_sqlite_insert_limit(self):
+        # SQLite принимает не больше 500 строк в одном INSERT, а пачки
+        # по умолчанию больше.
+        call_command(
+            "seed", users=10, posts=50, comments=1500, groups=1,
+            follows=1, stdout=StringIO(),
+        )
+        self.assertGreater(Comment.objects.count(), 500)
+        author = User.objects.first()
+        Post.objects.bulk_create([
+            Post(text=f"Пост {i} #котики", author=author) for i in range(600)
+        ])
+        call_command("rebuild_tags", stdout=StringIO())
+        self.assertEqual(PostTag.objects.count(), 600)
@@ -1,10 +1,25 @@
+from datetime import timedelta
+from io import StringIO
+
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.paginator import Page
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django import forms
 
-from .. models import Follow, Group, Post
+from ..cache import FEED_VERSION_KEY, feed_version, post_item_key
+from ..cards import author_card, author_cards
+from ..paginators import encode_cursor
+from .. models import (Comment, FeedVersion, Follow, Group, Mention, Post,
+                       PostActivity, PostTag, TimelineEntry)
+from ..trending import (TRENDING_KEY, TRENDING_LOCK_KEY, add_activity,
+                        current_hour, views)
 
 User = get_user_model()
 
@@ -69,13 +84,43 @@ class PostPagesTests(TestCase):
         cache.clear()
         response = self.authorized_client.get(reverse("index"))
         content = response.content
-        test_post.delete()
+        # update() не шлет сигналов, поэтому кеш ленты не сбрасывается
+        Post.objects.filter(pk=test_post.pk).update(
+            text="Changed post", text_html="Changed post"
+        )
         response = self.authorized_client.get(reverse("index"))
         self.assertEqual(response.content, content)
         cache.clear()
         response = self.authorized_client.get(reverse("index"))
         self.assertNotEqual(response.content, content)
 
+    def test_index_cache_ignores_extra_params(self):
+        test_post = Post.objects.create(text="Cached post", author=self.user)
+        cache.clear()
+        content = self.guest_client.get(reverse("index")).content
+        Post.objects.filter(pk=test_post.pk).update(
+            text="Changed post", text_html="Changed post"
+        )
+        response = self.guest_client.get(
+            reverse("index"), {"utm_source": "mail", "fbclid": "1"}
+        )
+        self.assertEqual(response.content, content)
+
+    def test_index_cache_invalidated_on_changes(self):
+        test_post = Post.objects.create(text="Cached post", author=self.user)
+        cache.clear()
+        content = self.guest_client.get(reverse("index")).content
+        Comment.objects.create(
+            post=test_post, author=self.user, text="New comment"
+        )
+        response = self.guest_client.get(reverse("index"))
+        self.assertNotEqual(response.content, content)
+        content = response.content
+        test_post.delete()
+        response = self.guest_client.get(reverse("index"))
+        self.assertNotEqual(response.content, content)
+        self.assertNotContains(response, "Cached post")
+
     def test_group_page_shows_correct_context(self):
         """Шаблон group сформирован с правильным контекстом."""
         response = self.authorized_client.get(reverse(
@@ -210,3 +255,721 @@ class PaginatorViewsTest(TestCase):
                 response = self.authorized_client.get(url)
                 self.assertEqual(
                     len(response.context.get("page").object_list), 10)
+
+    def test_next_page_by_cursor(self):
+        url = reverse("group", kwargs={"slug": self.test_group.slug})
+        first_page = self.authorized_client.get(url).context["page"]
+        cursor = first_page.paginator.next_cursor
+        response = self.authorized_client.get(url, {"after": cursor})
+        page = response.context["page"]
+        self.assertEqual(len(page.object_list), 3)
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
+        response = self.authorized_client.get(
+            url, {"before": page.paginator.previous_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context["page"]],
+            [post.pk for post in first_page],
+        )
+
+    def test_legacy_page_number(self):
+        url = reverse("profile", kwargs={"username": self.user})
+        response = self.authorized_client.get(url, {"page": 2})
+        self.assertEqual(len(response.context["page"].object_list), 3)
+
+    def test_broken_cursor_shows_first_page(self):
+        url = reverse("profile", kwargs={"username": self.user})
+        response = self.authorized_client.get(url, {"after": "broken"})
+        self.assertEqual(len(response.context["page"].object_list), 10)
+        self.assertFalse(response.context["page"].has_previous())
+
+    def test_out_of_range_page_and_cursor(self):
+        huge = "9" * 23
+        url = reverse("profile", kwargs={"username": self.user})
+        response = self.authorized_client.get(url, {"page": huge})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["page"].object_list)
+        search = reverse("search")
+        requests = [
+            (url, encode_cursor("2020-01-01T00:00:00+00:00", huge)),
+            (search, encode_cursor("1.0", huge)),
+            (search, encode_cursor("inf", 1)),
+        ]
+        for path, cursor in requests:
+            with self.subTest(path=path, cursor=cursor):
+                response = self.authorized_client.get(
+                    path, {"q": "Тестовый", "after": cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.context["page"].has_previous())
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Test-title",
+            description="Test_description",
+            slug="test-slug",
+        )
+        for i in range(15):
+            author = User.objects.create_user(username=f"author_{i}")
+            post = Post.objects.create(
+                text=f"Тестовый текст_{i}", author=author, group=cls.group
+            )
+            Comment.objects.create(post=post, author=cls.user, text="Hi")
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        # Версия ленты читается из базы раз в FEED_VERSION_TIMEOUT.
+        feed_version()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_queries_do_not_depend_on_posts_amount(self):
+        """Число запросов на страницу ленты не зависит от числа постов.
+
+        В базу идут сессия, пользователь и посты; лента подписок еще
+        выбирает популярных авторов и ключи записей.
+        """
+        pages = {
+            reverse("index"): 3,
+            reverse("group", kwargs={"slug": self.group.slug}): 4,
+            reverse("follow_index"): 5,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(len(response.context["page"]), 10)
+                self.assertEqual(response.context["page"][0].comment_count, 1)
+
+    def test_cached_page_links_keep_only_cursor(self):
+        self.client.get(reverse("index"), {"utm_source": "SECRET"})
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "?after=")
+        self.assertNotContains(response, "SECRET")
+
+
+class TimelineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader")
+        self.author = User.objects.create_user(username="author")
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow_page_texts(self):
+        response = self.authorized_client.get(reverse("follow_index"))
+        return [post.text for post in response.context["page"]]
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        Post.objects.create(text="Старый пост", author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(text="Новый пост", author=self.author)
+        self.assertEqual(
+            self.follow_page_texts(), ["Новый пост", "Старый пост"]
+        )
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(self.follow_page_texts(), [])
+
+    def test_follow_author_with_many_posts(self):
+        # SQLite принимает не больше 500 строк в одном INSERT.
+        Post.objects.bulk_create([
+            Post(text=f"Пост {i}", author=self.author) for i in range(600)
+        ])
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "author"})
+        )
+        entries = TimelineEntry.objects.filter(user=self.user)
+        self.assertEqual(entries.count(), 600)
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        for i in range(4):
+            Post.objects.create(text=f"Пост {i}", author=self.author)
+        entries = TimelineEntry.objects.filter(user=self.user)
+        self.assertEqual(entries.count(), 2)
+        self.assertEqual(self.follow_page_texts(), ["Пост 3", "Пост 2"])
+
+    @override_settings(TIMELINE_SIZE=2)
+    def test_each_follower_timeline_is_capped(self):
+        other = User.objects.create_user(username="other")
+        Post.objects.create(text="Пост другого", author=other)
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=other)
+        Follow.objects.create(user=other, author=self.author)
+        for i in range(3):
+            Post.objects.create(text=f"Пост {i}", author=self.author)
+        self.assertEqual(self.follow_page_texts(), ["Пост 2", "Пост 1"])
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=other).values_list(
+                "post__text", flat=True
+            ).order_by("-pub_date")),
+            ["Пост 2", "Пост 1"],
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_without_fan_out(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(text="Пост для всех", author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_page_texts(), ["Пост для всех"])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_and_fanned_out_posts_are_merged(self):
+        popular = User.objects.create_user(username="popular")
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=popular)
+        Follow.objects.create(user=other, author=popular)
+        for i in range(12):
+            Post.objects.create(
+                text=f"Пост {i}", author=(self.author, popular)[i % 2]
+            )
+        url = reverse("follow_index")
+        page = self.authorized_client.get(url).context["page"]
+        self.assertEqual(
+            [post.text for post in page],
+            [f"Пост {i}" for i in range(11, 1, -1)],
+        )
+        response = self.authorized_client.get(
+            url, {"after": page.paginator.next_cursor}
+        )
+        self.assertEqual(
+            [post.text for post in response.context["page"]],
+            ["Пост 1", "Пост 0"],
+        )
+        response = self.authorized_client.get(url, {"page": 2})
+        self.assertEqual(len(response.context["page"]), 2)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1, TIMELINE_FANOUT_RESUME=1)
+    def test_author_dropping_below_limit_is_backfilled_later(self):
+        other = User.objects.create_user(username="other")
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        Post.objects.create(text="Пост популярного", author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        # Отписка не раскладывает посты: автор пока читается напрямую.
+        Follow.objects.filter(user=other).delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.follow_page_texts(), ["Пост популярного"])
+        call_command("update_timelines", stdout=StringIO())
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(self.follow_page_texts(), ["Пост популярного"])
+        Post.objects.create(text="Новый пост", author=self.author)
+        self.assertEqual(
+            self.follow_page_texts(), ["Новый пост", "Пост популярного"]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2, TIMELINE_FANOUT_RESUME=1)
+    def test_fanout_resumes_well_below_limit(self):
+        readers = [
+            User.objects.create_user(username=f"reader{i}") for i in range(3)
+        ]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        Follow.objects.filter(user=readers[0]).delete()
+        call_command("update_timelines", stdout=StringIO())
+        # Подписчиков ровно на границе: рассылка еще не возобновлена.
+        Post.objects.create(text="Пост", author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+
+
+class FollowingIdsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="reader")
+        self.author = User.objects.create_user(username="author")
+        self.post = Post.objects.create(text="Пост", author=self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def following(self, url):
+        return self.authorized_client.get(url).context["following"]
+
+    def test_follow_state_is_cached_and_invalidated(self):
+        profile = reverse("profile", kwargs={"username": "author"})
+        post = reverse("post", kwargs={
+            "username": "author", "post_id": self.post.pk
+        })
+        self.assertFalse(self.following(profile))
+        self.authorized_client.get(
+            reverse("profile_follow", kwargs={"username": "author"})
+        )
+        self.assertTrue(self.following(profile))
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(self.following(post))
+        self.assertFalse(any(
+            "posts_follow" in query["sql"]
+            for query in context.captured_queries
+        ))
+        self.authorized_client.get(
+            reverse("profile_unfollow", kwargs={"username": "author"})
+        )
+        self.assertFalse(self.following(post))
+
+    def test_template_lookup(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.authorized_client.get(reverse("index"))
+        following_ids = response.context["following_ids"]
+        self.assertIn(self.author.pk, following_ids)
+        self.assertNotIn(self.user.pk, following_ids)
+
+
+class AuthorCardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username="reader")
+        self.author = User.objects.create_user(username="author")
+        self.other = User.objects.create_user(username="other")
+        Post.objects.create(text="Пост", author=self.author)
+        self.request = RequestFactory().get("/")
+        self.request.user = self.reader
+
+    def test_card_is_cached(self):
+        with self.assertNumQueries(2):
+            # Карточка и множество подписок читателя.
+            card = author_card(self.request, self.author)
+        self.assertEqual(card["author"], self.author)
+        self.assertEqual(card["post_amt"], 1)
+        self.assertFalse(card["following"])
+        self.request = RequestFactory().get("/")
+        self.request.user = self.reader
+        with self.assertNumQueries(0):
+            cached = author_card(self.request, self.author)
+        self.assertEqual(cached["post_amt"], 1)
+
+    def test_cards_are_invalidated(self):
+        author_card(self.request, self.author)
+        Post.objects.create(text="Еще пост", author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        del self.request._following_ids
+        card = author_card(self.request, self.author)
+        self.assertEqual(card["post_amt"], 2)
+        self.assertEqual(card["follower_amt"], 1)
+        self.assertTrue(card["following"])
+        reader_card = author_card(self.request, self.reader)
+        self.assertEqual(reader_card["following_amt"], 1)
+
+    def test_many_cards_in_one_query(self):
+        author_card(self.request, self.author)
+        with self.assertNumQueries(1):
+            cards = author_cards(
+                self.request, [self.author.pk, self.other.pk, self.reader.pk]
+            )
+        self.assertEqual(
+            {pk: card["author"].username for pk, card in cards.items()},
+            {
+                self.author.pk: "author",
+                self.other.pk: "other",
+                self.reader.pk: "reader",
+            },
+        )
+
+
+@override_settings(COMMENTS_PER_PAGE=20)
+class CommentsPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.post = Post.objects.create(text="Пост", author=self.author)
+        for i in range(25):
+            commenter = User.objects.create_user(username=f"reader_{i}")
+            Comment.objects.create(
+                post=self.post, author=commenter, text=f"Ответ {i}"
+            )
+        self.post_url = reverse(
+            "post", kwargs={"username": "author", "post_id": self.post.pk}
+        )
+        self.guest_client = Client()
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def comment_queries(self, context):
+        return [
+            query for query in context.captured_queries
+            if 'FROM "posts_comment"' in query["sql"]
+        ]
+
+    def test_first_page_and_load_more(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.guest_client.get(self.post_url)
+        self.assertEqual(len(self.comment_queries(context)), 1)
+        page = response.context["comments"]
+        self.assertEqual(self.texts(page)[0], "Ответ 24")
+        self.assertEqual(len(page), 20)
+        self.assertContains(response, "Показать еще")
+        url = reverse(
+            "post_comments",
+            kwargs={"username": "author", "post_id": self.post.pk},
+        )
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(
+                f"{url}?{page.paginator.next_query}"
+            )
+        self.assertEqual(
+            self.texts(response.context["comments"]),
+            [f"Ответ {i}" for i in range(4, -1, -1)],
+        )
+        self.assertNotContains(response, "Показать еще")
+
+    def test_cached_first_page_links_keep_only_cursor(self):
+        self.guest_client.get(self.post_url, {"utm_source": "SECRET"})
+        response = self.guest_client.get(self.post_url)
+        self.assertContains(response, "Показать еще")
+        self.assertNotContains(response, "SECRET")
+
+    def test_first_page_cache_reset_by_new_comment(self):
+        self.guest_client.get(self.post_url)
+        with CaptureQueriesContext(connection) as context:
+            self.guest_client.get(self.post_url)
+        self.assertEqual(self.comment_queries(context), [])
+        client = Client()
+        client.force_login(self.author)
+        client.post(
+            reverse(
+                "add_comment",
+                kwargs={"username": "author", "post_id": self.post.pk},
+            ),
+            {"text": "Свежий ответ"},
+        )
+        response = self.guest_client.get(self.post_url)
+        self.assertEqual(
+            self.texts(response.context["comments"])[0], "Свежий ответ"
+        )
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="author")
+        for i in range(12):
+            Post.objects.create(text=f"Котики номер {i}", author=cls.user)
+        cls.post = Post.objects.create(text="Про собак", author=cls.user)
+        Comment.objects.create(
+            post=cls.post, author=cls.user, text="А я люблю попугаев"
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, **params):
+        return self.guest_client.get(reverse("search"), params)
+
+    def check_search(self):
+        response = self.search(q="Котики")
+        first_page = response.context["page"]
+        self.assertEqual(len(first_page), 10)
+        response = self.search(
+            q="Котики", after=first_page.paginator.next_cursor
+        )
+        second_page = response.context["page"]
+        self.assertEqual(len(second_page), 2)
+        self.assertFalse(second_page.has_next())
+        found = {post.pk for post in first_page} | {
+            post.pk for post in second_page
+        }
+        self.assertEqual(len(found), 12)
+        self.assertNotIn(self.post.pk, found)
+        response = self.search(q="попугаев")
+        self.assertEqual(list(response.context["page"]), [self.post])
+        response = self.search(q='"OR (')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["page"])
+
+    def test_search_fts(self):
+        self.check_search()
+
+    @override_settings(SEARCH_BACKEND="posts.search.SimpleBackend")
+    def test_search_simple_backend(self):
+        self.check_search()
+
+    def test_index_follows_changes_and_rebuild(self):
+        self.post.text = "Про хомяков"
+        self.post.save()
+        self.assertFalse(self.search(q="собак").context["page"])
+        self.assertTrue(self.search(q="хомяков").context["page"])
+        Comment.objects.all().delete()
+        self.assertFalse(self.search(q="попугаев").context["page"])
+        call_command("rebuild_search_index", batch_size=5, stdout=StringIO())
+        self.assertEqual(len(self.search(q="Котики").context["page"]), 10)
+        self.assertTrue(self.search(q="хомяков").context["page"])
+
+
+class ConditionalPagesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(
+            text="Тестовый текст", author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_not_modified_pages(self):
+        urls = [
+            reverse("index"),
+            reverse("profile", kwargs={"username": self.author}),
+            reverse("post", kwargs={
+                "username": self.author, "post_id": self.post.pk
+            }),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn("public", response["Cache-Control"])
+                self.assertIn("Cookie", response["Vary"])
+                with self.assertNumQueries(1 if url != urls[0] else 0):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response["ETag"]
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_content_and_viewer(self):
+        url = reverse("profile", kwargs={"username": self.author})
+        etag = self.guest_client.get(url)["ETag"]
+        response = self.authorized_client.get(url)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("private", response["Cache-Control"])
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        Comment.objects.create(post=self.post, author=self.reader, text="Hi")
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_follows_writes_of_other_processes(self):
+        url = reverse("index")
+        etag = self.guest_client.get(url)["ETag"]
+        # Другой процесс правит пост: версия меняется в базе, а копия
+        # этого процесса живет до FEED_VERSION_TIMEOUT.
+        FeedVersion.objects.update(version=F("version") + 1)
+        cache.delete(FEED_VERSION_KEY)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class PostItemCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.post = Post.objects.create(
+            text="Первая версия", author=self.author
+        )
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.url = reverse("profile", kwargs={"username": self.author})
+
+    def test_fragment_is_cached_per_viewer(self):
+        self.assertNotContains(self.guest_client.get(self.url), "Редактиров")
+        self.assertContains(self.author_client.get(self.url), "Редактиров")
+        keys = [
+            post_item_key(Post.objects.feed().get(), is_author)
+            for is_author in (False, True)
+        ]
+        self.assertEqual(len(cache.get_many(keys)), 2)
+
+    def test_fragment_is_invalidated_by_edit(self):
+        self.assertContains(self.guest_client.get(self.url), "Первая версия")
+        self.author_client.post(
+            reverse("edit", kwargs={
+                "username": self.author, "post_id": self.post.pk
+            }),
+            {"text": "Вторая версия"},
+        )
+        response = self.guest_client.get(self.url)
+        self.assertContains(response, "Вторая версия")
+        self.assertNotContains(response, "Первая версия")
+
+
+class HashtagTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_tags_and_mentions_are_indexed(self):
+        post = Post.objects.create(
+            text="Про #Django и #django, спасибо @reader. Привет @nobody",
+            author=self.author,
+        )
+        self.assertEqual(
+            list(post.post_tags.values_list("tag__name", flat=True)),
+            ["django"],
+        )
+        self.assertEqual(
+            list(post.mentions.values_list("user_id", flat=True)),
+            [self.reader.pk],
+        )
+        self.assertIn('<a href="/tag/django/">#Django</a>', post.text_html)
+        self.assertIn('<a href="/reader/">@reader</a>.', post.text_html)
+        # Ссылки только на существующие страницы.
+        self.assertIn("Привет @nobody", post.text_html)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="#Django @author"
+        )
+        self.assertEqual(
+            comment.text_html, '#Django <a href="/author/">@author</a>'
+        )
+        post.text = "Теперь про #python"
+        post.save()
+        self.assertEqual(
+            list(post.post_tags.values_list("tag__name", flat=True)),
+            ["python"],
+        )
+        self.assertFalse(post.mentions.exists())
+
+    def test_tag_and_mentions_feeds(self):
+        posts = [
+            Post.objects.create(
+                text=f"Пост {i} #Тест @reader", author=self.author
+            )
+            for i in range(13)
+        ]
+        Post.objects.create(text="Без тега", author=self.author)
+        url = reverse("tag", kwargs={"name": "тест"})
+        page = self.reader_client.get(url).context["page"]
+        self.assertEqual(type(page), Page)
+        self.assertEqual(
+            [post.pk for post in page], [post.pk for post in posts[:2:-1]]
+        )
+        response = self.reader_client.get(
+            url, {"after": page.paginator.next_cursor}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context["page"]],
+            [post.pk for post in posts[2::-1]],
+        )
+        response = self.reader_client.get(reverse("mentions"))
+        self.assertEqual(len(response.context["page"]), 10)
+        self.assertEqual(
+            self.reader_client.get(reverse("tag", args=["нет"])).status_code,
+            404,
+        )
+
+    def test_rebuild_command(self):
+        Post.objects.create(text="#a #b @reader", author=self.author)
+        PostTag.objects.all().delete()
+        Mention.objects.all().delete()
+        call_command("rebuild_tags", batch_size=1, stdout=StringIO())
+        self.assertEqual(PostTag.objects.count(), 2)
+        self.assertEqual(Mention.objects.count(), 1)
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Просмотры из прошлых тестов: их посты уже откатились.
+        views.flush()
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+        self.posts = [
+            Post.objects.create(text=f"Пост {i}", author=self.author)
+            for i in range(3)
+        ]
+        self.guest_client = Client()
+
+    def comment(self, post, amount=1):
+        for _ in range(amount):
+            Comment.objects.create(post=post, author=self.reader, text="Hi")
+
+    def ranked(self):
+        response = self.guest_client.get(reverse("trending"))
+        self.assertEqual(type(response.context["page"]), Page)
+        return [post.pk for post in response.context["page"]]
+
+    def test_ranking_by_comments_and_views(self):
+        self.comment(self.posts[0])
+        self.comment(self.posts[2], 2)
+        # Просмотр весит меньше комментария.
+        for _ in range(11):
+            self.guest_client.get(reverse("post", kwargs={
+                "username": "author", "post_id": self.posts[1].pk
+            }))
+        self.assertEqual(
+            self.ranked(), [self.posts[1].pk, self.posts[2].pk,
+                            self.posts[0].pk]
+        )
+        self.assertEqual(
+            PostActivity.objects.get(post=self.posts[1]).views, 11
+        )
+
+    def test_old_activity_decays(self):
+        old = timezone.now() - timedelta(hours=24)
+        add_activity({self.posts[0].pk: 3}, "comments", current_hour(old))
+        self.comment(self.posts[1])
+        self.assertEqual(self.ranked(), [self.posts[1].pk, self.posts[0].pk])
+
+    def test_ranking_is_cached(self):
+        self.comment(self.posts[0])
+        self.ranked()
+        self.comment(self.posts[1], 2)
+        # Страница читает готовый список: один запрос за постами.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.ranked(), [self.posts[0].pk])
+        call_command("update_trending", stdout=StringIO())
+        self.assertEqual(self.ranked(), [self.posts[1].pk, self.posts[0].pk])
+
+    def test_expired_ranking_is_refreshed_once(self):
+        self.comment(self.posts[0])
+        self.ranked()
+        self.comment(self.posts[1], 2)
+        cache.delete(TRENDING_KEY)
+        # Пока другой запрос пересчитывает, отдается прошлый рейтинг.
+        cache.add(TRENDING_LOCK_KEY, True)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.ranked(), [self.posts[0].pk])
+        cache.delete(TRENDING_LOCK_KEY)
+        self.assertEqual(self.ranked(), [self.posts[1].pk, self.posts[0].pk])
+
+    def test_not_modified_counts_view(self):
+        url = reverse("post", kwargs={
+            "username": "author", "post_id": self.posts[0].pk
+        })
+        etag = self.guest_client.get(url)["ETag"]
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        views.flush()
+        self.assertEqual(
+            PostActivity.objects.get(post=self.posts[0]).views, 2
+        )
+
+    def test_pages_by_rank(self):
+        posts = [
+            Post.objects.create(text=f"Еще {i}", author=self.author)
+            for i in range(12)
+        ]
+        for amount, post in enumerate(posts, 1):
+            self.comment(post, amount)
+        url = reverse("trending")
+        page = self.guest_client.get(url).context["page"]
+        self.assertEqual(
+            [post.pk for post in page], [post.pk for post in posts[:1:-1]]
+        )
+        response = self.guest_client.get(
+            url, {"after": page.paginator.next_cursor}
+        )
+        page = response.context["page"]
+        self.assertEqual(
+            [post.pk for post in page], [post.pk for post in posts[1::-1]]
+        )
+        self.assertTrue(page.has_previous())
+        self.assertFalse(page.has_next())
@@ -0,0 +1,71 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import get_thumbnail
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Размер карточки в ленте и дополнительные размеры для srcset.
+FEED_SIZE = "960x339"
+SIZES = ("480x170", FEED_SIZE, "1920x678")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+    return _executor
+
+
+def render_thumbnails(post_id):
+    """Готовит миниатюры картинки поста и сохраняет их адреса."""
+    post = Post.objects.filter(pk=post_id).only("image").first()
+    if post is None or not post.image:
+        return
+    thumbnails = {
+        size: get_thumbnail(post.image, size, crop="center", upscale=True)
+        for size in SIZES
+    }
+    srcset = ", ".join(
+        f"{thumbnail.url} {thumbnail.width}w"
+        for thumbnail in thumbnails.values()
+    )
+    # Если картинку успели заменить, результат устарел.
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail_url=thumbnails[FEED_SIZE].url,
+        thumbnail_srcset=srcset,
+    )
+
+
+def _run(post_id):
+    try:
+        render_thumbnails(post_id)
+    except Exception:
+        logger.exception("Не удалось подготовить миниатюры поста %s", post_id)
+    finally:
+        connection.close()
+
+
+def submit(post_id):
+    if settings.THUMBNAIL_QUEUE == "sync":
+        render_thumbnails(post_id)
+    else:
+        _get_executor().submit(_run, post_id)
+
+
+def schedule_thumbnails(post):
+    """Ставит подготовку миниатюр в очередь после коммита транзакции."""
+    if post.image:
+        transaction.on_commit(lambda: submit(post.pk))
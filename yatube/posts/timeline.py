@@ -0,0 +1,203 @@
+from django.conf import settings
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import MergedPaginator
+
+BATCH_SIZE = 1000
+
+
+def is_fanout_author(author_id):
+    """Рассылаем посты автора подписчикам, если их не слишком много."""
+    return not UserStats.objects.filter(
+        user_id=author_id, timeline_fanout=False
+    ).exists()
+
+
+def stop_fanout(author_id):
+    """Перестает рассылать посты автора, число подписчиков которого
+    превысило TIMELINE_FANOUT_LIMIT."""
+    UserStats.objects.filter(
+        user_id=author_id, timeline_fanout=True,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).update(timeline_fanout=False)
+
+
+def _push(entries):
+    # Размер пачки INSERT выбирает бэкенд: SQLite не примет больше 500
+    # строк в одном запросе.
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def trim(users):
+    """Оставляет в лентах пользователей только TIMELINE_SIZE записей.
+
+    Граница ищется один раз на пользователя по индексу (user, pub_date),
+    а удаление идет только в переполненных лентах.
+    """
+    for user_id in users:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        overflow = entries.order_by("-pub_date").values_list(
+            "pub_date", flat=True
+        )[settings.TIMELINE_SIZE:settings.TIMELINE_SIZE + 1]
+        for cutoff in overflow:
+            entries.filter(pub_date__lte=cutoff).delete()
+
+
+def fan_out(post):
+    """Кладет новый пост в ленты подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    batch = []
+    for user_id in followers.iterator():
+        batch.append(TimelineEntry(
+            user_id=user_id, post=post,
+            author_id=post.author_id, pub_date=post.pub_date,
+        ))
+        if len(batch) == BATCH_SIZE:
+            _push(batch)
+            batch = []
+    _push(batch)
+    trim(followers)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты автора после подписки."""
+    if not is_fanout_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        "-pub_date"
+    ).values_list("pk", "pub_date")[:settings.TIMELINE_SIZE]
+    _push([
+        TimelineEntry(
+            user_id=user_id, post_id=pk,
+            author_id=author_id, pub_date=pub_date,
+        )
+        for pk, pub_date in posts
+    ])
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def popular_authors(user):
+    """Авторы из подписок, посты которых не рассылаются."""
+    return list(Follow.objects.filter(
+        user=user, author__stats__timeline_fanout=False,
+    ).values_list("author_id", flat=True))
+
+
+def timeline_sources(user):
+    """Источники ленты подписок для MergedPaginator: разосланные записи
+    и посты каждого автора с огромным числом подписчиков, которые
+    читаются напрямую по индексу (author, pub_date)."""
+    popular = popular_authors(user)
+    # Записи, разосланные до того, как автор стал популярным, читаются
+    # вместе с остальными его постами.
+    entries = TimelineEntry.objects.filter(user=user).exclude(
+        author_id__in=popular
+    )
+    return [(entries, "post_id")] + [
+        (Post.objects.filter(author_id=author_id), "pk")
+        for author_id in popular
+    ]
+
+
+def timeline_paginator(user, per_page):
+    return MergedPaginator(
+        timeline_sources(user), Post.objects.feed(), per_page
+    )
+
+
+def latest_pub_date(user):
+    """Дата самого нового поста ленты подписок."""
+    dates = [
+        queryset.order_by("-pub_date").values_list(
+            "pub_date", flat=True
+        ).first()
+        for queryset, _ in timeline_sources(user)
+    ]
+    return max(filter(None, dates), default=None)
+
+
+def backfill_followers(author_id):
+    """Рассылает последние посты автора всем подписчикам: пока он был
+    популярным, его посты в ленты не попадали."""
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        "-pub_date"
+    ).values_list("pk", "pub_date")[:settings.TIMELINE_SIZE])
+    followers = list(Follow.objects.filter(
+        author_id=author_id
+    ).values_list("user_id", flat=True))
+    batch = []
+    for user_id in followers:
+        for pk, pub_date in posts:
+            batch.append(TimelineEntry(
+                user_id=user_id, post_id=pk,
+                author_id=author_id, pub_date=pub_date,
+            ))
+            if len(batch) == BATCH_SIZE:
+                _push(batch)
+                batch = []
+    _push(batch)
+    trim(followers)
+
+
+def resume_fanout():
+    """Возобновляет рассылку авторам, у которых подписчиков стало не
+    больше TIMELINE_FANOUT_RESUME, и возвращает их число.
+
+    Запись в ленты тысяч подписчиков слишком долга для запроса, который
+    удалил подписку, поэтому идет здесь, по расписанию; до этого посты
+    автора читаются напрямую. Запас между TIMELINE_FANOUT_RESUME и
+    TIMELINE_FANOUT_LIMIT не дает переключать автора туда и обратно.
+    """
+    authors = UserStats.objects.filter(
+        timeline_fanout=False,
+        followers_count__lte=settings.TIMELINE_FANOUT_RESUME,
+    ).values_list("user_id", flat=True)
+    amount = 0
+    for author_id in list(authors):
+        # Сначала включаем рассылку: новые посты не должны проскочить
+        # между раскладкой старых и переключением.
+        UserStats.objects.filter(user_id=author_id).update(
+            timeline_fanout=True
+        )
+        backfill_followers(author_id)
+        amount += 1
+    return amount
+
+
+def rebuild():
+    """Собирает ленты подписок заново, по одному запросу на читателя."""
+    TimelineEntry.objects.all().delete()
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    UserStats.objects.filter(followers_count__lte=limit).update(
+        timeline_fanout=True
+    )
+    UserStats.objects.filter(followers_count__gt=limit).update(
+        timeline_fanout=False
+    )
+    readers = Follow.objects.order_by("user_id").values_list(
+        "user_id", flat=True
+    ).distinct()
+    amount = 0
+    for user_id in list(readers):
+        posts = Post.objects.filter(
+            author__following__user_id=user_id,
+            author__stats__timeline_fanout=True,
+        ).order_by("-pub_date").values_list("pk", "author_id", "pub_date")
+        entries = [
+            TimelineEntry(
+                user_id=user_id, post_id=pk,
+                author_id=author_id, pub_date=pub_date,
+            )
+            for pk, author_id, pub_date in posts[:settings.TIMELINE_SIZE]
+        ]
+        _push(entries)
+        amount += len(entries)
+    return amount
@@ -0,0 +1,164 @@
+"""Популярные посты.
+
+Комментарии и просмотры копятся в почасовых счетчиках PostActivity.
+Оценка поста — активность за TRENDING_WINDOW_HOURS, вес которой падает
+вдвое каждые TRENDING_HALF_LIFE_HOURS. Первые TRENDING_SIZE постов
+пересчитываются раз в TRENDING_TIMEOUT и лежат в кеше, поэтому
+страница не зависит от числа постов. Когда кеш истек, пересчитывает
+только один запрос, а остальные до его окончания получают прошлый
+рейтинг.
+
+Просмотры не пишутся в базу на каждый запрос: процесс копит их в
+памяти и сбрасывает пачкой не чаще раза в VIEWS_FLUSH_SECONDS.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from yatube.metrics import record_cache
+
+from .models import Comment, Post, PostActivity
+
+COMMENT_WEIGHT = 5
+VIEW_WEIGHT = 1
+VIEWS_FLUSH_SECONDS = 60
+TRENDING_KEY = "trending"
+TRENDING_LAST_KEY = "trending:last"
+TRENDING_LOCK_KEY = "trending:lock"
+TRENDING_LOCK_SECONDS = 60
+
+
+def current_hour(now=None):
+    now = now or timezone.now()
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start(now=None):
+    return current_hour(now) - timedelta(
+        hours=settings.TRENDING_WINDOW_HOURS
+    )
+
+
+def add_activity(counts, field, hour=None):
+    """Прибавляет к счетчику field за час hour: counts — {id поста:
+    сколько}."""
+    if not counts:
+        return
+    hour = hour or current_hour()
+    with transaction.atomic():
+        PostActivity.objects.bulk_create(
+            [PostActivity(post_id=pk, hour=hour) for pk in counts],
+            ignore_conflicts=True,
+        )
+        for pk, amount in counts.items():
+            PostActivity.objects.filter(post_id=pk, hour=hour).update(
+                **{field: F(field) + amount}
+            )
+
+
+class ViewBuffer:
+    """Просмотры постов в памяти процесса до сброса в базу."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.flushed = time.monotonic()
+
+    def add(self, post_id):
+        with self.lock:
+            self.counts[post_id] += 1
+            if time.monotonic() - self.flushed < VIEWS_FLUSH_SECONDS:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed = time.monotonic()
+        # Пост могли удалить, пока просмотры ждали в памяти.
+        existing = Post.objects.filter(pk__in=list(counts)).values_list(
+            "pk", flat=True
+        )
+        add_activity({pk: counts[pk] for pk in existing}, "views")
+
+
+views = ViewBuffer()
+
+
+def record_view(post_id):
+    views.add(post_id)
+
+
+def compute(now=None):
+    """Пары (id поста, оценка) первых TRENDING_SIZE постов."""
+    now = now or timezone.now()
+    rows = PostActivity.objects.filter(
+        hour__gte=window_start(now)
+    ).values_list("post_id", "hour", "comments", "views")
+    scores = defaultdict(float)
+    for post_id, hour, comments, viewed in rows.iterator():
+        age = (now - hour).total_seconds() / 3600
+        decay = 0.5 ** (age / settings.TRENDING_HALF_LIFE_HOURS)
+        activity = COMMENT_WEIGHT * comments + VIEW_WEIGHT * viewed
+        scores[post_id] += activity * decay
+    return heapq.nlargest(
+        settings.TRENDING_SIZE, scores.items(), key=lambda item: item[1]
+    )
+
+
+def refresh():
+    """Пересчитывает рейтинг и кладет id постов в кеш."""
+    views.flush()
+    ids = [post_id for post_id, _ in compute()]
+    cache.set(TRENDING_KEY, ids, settings.TRENDING_TIMEOUT)
+    # Прошлый рейтинг не истекает: его отдают, пока идет пересчет.
+    cache.set(TRENDING_LAST_KEY, ids, None)
+    return ids
+
+
+def trending_ids():
+    ids = cache.get(TRENDING_KEY)
+    record_cache(ids is not None)
+    if ids is not None:
+        return ids
+    if not cache.add(TRENDING_LOCK_KEY, True, TRENDING_LOCK_SECONDS):
+        # Рейтинг уже считает другой запрос.
+        return cache.get(TRENDING_LAST_KEY, [])
+    try:
+        return refresh()
+    finally:
+        cache.delete(TRENDING_LOCK_KEY)
+
+
+def prune():
+    """Удаляет счетчики, вышедшие за окно рейтинга."""
+    return PostActivity.objects.filter(
+        hour__lt=window_start()
+    ).delete()[0]
+
+
+def rebuild():
+    """Пересчитывает комментарии за окно по таблице комментариев,
+    например после массовой загрузки; просмотры остаются."""
+    since = window_start()
+    PostActivity.objects.filter(hour__gte=since).update(comments=0)
+    rows = Comment.objects.filter(
+        created__gte=since, post__isnull=False
+    ).annotate(
+        hour=TruncHour("created", tzinfo=timezone.utc)
+    ).order_by().values("hour", "post_id").annotate(amount=Count("pk"))
+    by_hour = defaultdict(dict)
+    for row in rows:
+        by_hour[row["hour"]][row["post_id"]] = row["amount"]
+    for hour, counts in by_hour.items():
+        add_activity(counts, "comments", hour)
+    return sum(len(counts) for counts in by_hour.values())
@@ -8,6 +8,10 @@ urlpatterns = [
     path("new/", views.new_post, name="new_post"),
     path("group/<slug:slug>/", views.group_posts, name="group"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
+    path("tag/<str:name>/", views.tag_posts, name="tag"),
+    path("mentions/", views.mentions, name="mentions"),
+    path("trending/", views.trending, name="trending"),
     path("<str:username>/", views.profile, name="profile"),
     path(
         "<str:username>/follow/",
@@ -24,6 +28,11 @@ urlpatterns = [
         name="add_comment"
     ),
     path("<str:username>/<int:post_id>/", views.post_view, name="post"),
+    path(
+        "<str:username>/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments"
+    ),
     path("<str:username>/<int:post_id>/edit/", views.post_edit, name="edit"),
     path("404/", views.page_not_found, name="404"),
     path("500/", views.server_error, name="500"),
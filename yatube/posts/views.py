@@ -1,92 +1,117 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 from django.core.cache import cache
+from django.db import transaction
+from django.http import QueryDict
 from django.views.decorators.http import require_GET
 
+from yatube.metrics import record_cache
+
+from .cache import COMMENTS_TIMEOUT, comments_key, feed_cache_context
+from .cards import author_card
+from .decorators import (author_stamp, conditional_page, counts_view,
+                         group_stamp)
 from .forms import PostForm, CommentForm
-from .models import Follow, Group, Post, User
+from .models import Follow, Group, Post, Tag, User
+from .paginators import (CURSOR_PARAMS, CommentPaginator, IndexPaginator,
+                         KeysetPaginator, RankPaginator, SearchPaginator,
+                         cursor_params)
+from .search import get_backend
+from .thumbnails import schedule_thumbnails
+from .timeline import timeline_paginator
+from .trending import trending_ids
+
+
+def get_page(request, post_list):
+    paginator = KeysetPaginator(post_list, settings.PAGES_OBG_AMT)
+    return paginator.get_page(request.GET)
+
+
+def get_comments_page(request, post):
+    """Страница комментариев; первая берется из кеша поста."""
+    paginator = CommentPaginator(
+        post.comments.select_related("author"), settings.COMMENTS_PER_PAGE
+    )
+    if any(param in request.GET for param in CURSOR_PARAMS):
+        return paginator.get_page(request.GET)
+    key = comments_key(post.pk)
+    page = cache.get(key)
+    record_cache(page is not None)
+    if page is None:
+        page = paginator.get_page(QueryDict())
+        cache.set(key, page, COMMENTS_TIMEOUT)
+    return page
 
 
 @require_GET
+@conditional_page()
 def index(request):
-    post_list = cache.get("index_page")
-    if not post_list:
-        post_list = Post.objects.all()
-        cache.set("index_page", post_list)
-    paginator = Paginator(post_list, settings.PAGES_OBG_AMT)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    return render(
-        request,
-        "index.html",
-        {"page": page, }
-    )
+    context = feed_cache_context(request)
+    key = f"index_page:{context['feed_version']}:{context['feed_cursor']}"
+    page = cache.get(key)
+    record_cache(page is not None)
+    if page is None:
+        paginator = KeysetPaginator(
+            Post.objects.feed(), settings.PAGES_OBG_AMT
+        )
+        page = paginator.get_page(cursor_params(request.GET))
+        cache.set(key, page)
+    context["page"] = page
+    return render(request, "index.html", context)
 
 
+@conditional_page(group_stamp)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.group_posts.all()
-    paginator = Paginator(posts_list, settings.PAGES_OBG_AMT)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    posts_list = group.group_posts.feed()
+    page = get_page(request, posts_list)
     return render(request, "group.html", {"group": group, "page": page})
 
 
+@conditional_page(author_stamp)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.author_posts.all()
-    post_amt = posts.count()
-    paginator = Paginator(posts, settings.PAGES_OBG_AMT)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = False
-    if request.user.is_authenticated:
-        if Follow.objects.filter(user=request.user, author=author).exists():
-            following = True
-    follower_amt = author.follower.count()
-    following_amt = author.following.count()
-    context = {
-        "author": author,
-        "post_amt": post_amt,
-        "page": page,
-        "following": following,
-        "follower_amt": follower_amt,
-        "following_amt": following_amt,
-    }
+    posts = author.author_posts.feed()
+    context = author_card(request, author)
+    context["page"] = get_page(request, posts)
     return render(request, "profile.html", context)
 
 
+@counts_view
+@conditional_page(author_stamp)
 def post_view(request, username, post_id):
     post_of_author = get_object_or_404(
-        Post,
+        Post.objects.feed(),
+        author__username=username,
+        pk=post_id
+    )
+    context = author_card(request, post_of_author.author)
+    context.update({
+        "post_of_author": post_of_author,
+        "comments": get_comments_page(request, post_of_author),
+        "form": CommentForm(),
+    })
+    return render(request, "post.html", context)
+
+
+@require_GET
+def post_comments(request, username, post_id):
+    """Следующая пачка комментариев для кнопки «Показать еще»."""
+    post_of_author = get_object_or_404(
+        Post.objects.select_related("author"),
         author__username=username,
         pk=post_id
     )
-    author = post_of_author.author
-    post_amt = author.author_posts.count()
-    comments = post_of_author.comments.all()
-    form = CommentForm()
-    following = False
-    if request.user.is_authenticated:
-        if Follow.objects.filter(user=request.user, author=author).exists():
-            following = True
-    follower_amt = author.follower.count()
-    following_amt = author.following.count()
     context = {
         "post_of_author": post_of_author,
-        "post_amt": post_amt,
-        "comments": comments,
-        "form": form,
-        "following": following,
-        "follower_amt": follower_amt,
-        "following_amt": following_amt,
+        "comments": get_comments_page(request, post_of_author),
     }
-    return render(request, "post.html", context)
+    return render(request, "includes/comment_list.html", context)
 
 
 @login_required()
+@transaction.atomic
 def new_post(request):
     header = "Добавить запись"
     action = "Добавить"
@@ -95,6 +120,7 @@ def new_post(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        schedule_thumbnails(new_post)
         return redirect("index")
     return render(
         request,
@@ -118,7 +144,14 @@ def post_edit(request, username, post_id):
     )
     if request.method == "POST":
         if form.is_valid():
-            form.save()
+            post = form.save(commit=False)
+            image_changed = "image" in form.changed_data
+            if image_changed:
+                post.thumbnail_url = ""
+                post.thumbnail_srcset = ""
+            post.save()
+            if image_changed:
+                schedule_thumbnails(post)
             return redirect(
                 "post", username=request.user.username, post_id=post_id)
 
@@ -130,6 +163,7 @@ def post_edit(request, username, post_id):
 
 
 @login_required()
+@transaction.atomic
 def add_comment(request, username, post_id):
     post_of_author = get_object_or_404(
         Post,
@@ -159,10 +193,8 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.PAGES_OBG_AMT)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    paginator = timeline_paginator(request.user, settings.PAGES_OBG_AMT)
+    page = paginator.get_page(request.GET)
     return render(
         request,
         "follow.html",
@@ -170,7 +202,46 @@ def follow_index(request):
     )
 
 
+def get_index_page(request, rows):
+    rows = rows.select_related("post__author", "post__group")
+    paginator = IndexPaginator(rows, settings.PAGES_OBG_AMT)
+    return paginator.get_page(request.GET)
+
+
+@require_GET
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    page = get_index_page(request, tag.post_tags.all())
+    return render(request, "tag.html", {"tag": tag, "page": page})
+
+
+@login_required
+def mentions(request):
+    page = get_index_page(request, request.user.mentions.all())
+    return render(request, "mentions.html", {"page": page})
+
+
+@require_GET
+def trending(request):
+    paginator = RankPaginator(
+        trending_ids(), Post.objects.feed(), settings.PAGES_OBG_AMT
+    )
+    page = paginator.get_page(request.GET)
+    return render(request, "trending.html", {"page": page})
+
+
+@require_GET
+def search(request):
+    query = request.GET.get("q", "").strip()
+    paginator = SearchPaginator(
+        get_backend(), query, Post.objects.feed(), settings.PAGES_OBG_AMT
+    )
+    page = paginator.get_page(request.GET)
+    return render(request, "search.html", {"query": query, "page": page})
+
+
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if not request.user == author:
@@ -182,6 +253,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
@@ -0,0 +1,81 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class SessionStorageTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user")
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+        CACHES={
+            "default": settings.CACHES["default"],
+            "sessions": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "sessions",
+            },
+        },
+    )
+    def test_cached_db_sessions_skip_database(self):
+        client = Client()
+        client.force_login(self.user)
+        # Сессия уже в кеше: из базы читается только пользователь.
+        with self.assertNumQueries(1):
+            client.get(reverse("about:author"))
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_db_sessions_without_shared_cache(self):
+        # Кеш в памяти процесса не видит выхода в других процессах.
+        self.assertNotIn("sessions", settings.CACHES)
+        self.assertEqual(
+            settings.SESSION_ENGINE, "django.contrib.sessions.backends.db"
+        )
+        client = Client()
+        client.force_login(self.user)
+        client.get(reverse("about:author"))
+        Session.objects.all().delete()
+        response = client.get(reverse("follow_index"))
+        self.assertEqual(response.status_code, 302)
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies"
+    )
+    def test_signed_cookie_sessions(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse("follow_index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Session.objects.exists())
+
+
+class ClearSessionsTest(TestCase):
+    def test_expired_sessions_removed_in_batches(self):
+        past = timezone.now() - timedelta(days=1)
+        future = timezone.now() + timedelta(days=1)
+        Session.objects.bulk_create(
+            [
+                Session(
+                    session_key=f"old{i}", session_data="", expire_date=past
+                )
+                for i in range(7)
+            ]
+            + [Session(session_key="fresh", session_data="",
+                       expire_date=future)]
+        )
+        output = StringIO()
+        call_command("clearsessions", batch_size=3, stdout=output)
+        self.assertIn("Удалено сессий: 7", output.getvalue())
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)),
+            ["fresh"],
+        )
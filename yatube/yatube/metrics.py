@@ -0,0 +1,208 @@
+"""Метрики запросов: число и время SQL-запросов, время рендеринга
+шаблонов, попадания в кеш.
+
+Данные копятся в памяти процесса по имени URL и отдаются в формате
+Prometheus на /metrics; каждый ответ получает заголовок Server-Timing.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float("inf"))
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current():
+    """Метрики текущего запроса или None вне запроса."""
+    return getattr(_local, "metrics", None)
+
+
+def record_cache(hit):
+    metrics = current()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    metrics = current()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            duration = time.perf_counter() - start
+            metrics.db_time += duration
+            metrics.queries.append((sql, duration))
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics = current()
+            if metrics is not None:
+                metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """Шаблонизатор Django, замеряющий время рендеринга страницы.
+
+    Вложенные include рендерятся внутри, поэтому время не двоится.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class Registry:
+    """Накопленные метрики процесса по имени URL."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.views = defaultdict(lambda: {
+            "requests": 0,
+            "duration": 0.0,
+            "buckets": [0] * len(BUCKETS),
+            "queries": 0,
+            "db_time": 0.0,
+            "template_time": 0.0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+        })
+
+    def observe(self, view, duration, metrics):
+        with self.lock:
+            data = self.views[view]
+            data["requests"] += 1
+            data["duration"] += duration
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    data["buckets"][index] += 1
+            data["queries"] += len(metrics.queries)
+            data["db_time"] += metrics.db_time
+            data["template_time"] += metrics.template_time
+            data["cache_hits"] += metrics.cache_hits
+            data["cache_misses"] += metrics.cache_misses
+
+    def render(self):
+        counters = (
+            ("requests", "yatube_requests_total"),
+            ("queries", "yatube_db_queries_total"),
+            ("db_time", "yatube_db_duration_seconds_total"),
+            ("template_time", "yatube_template_duration_seconds_total"),
+            ("cache_hits", "yatube_cache_hits_total"),
+            ("cache_misses", "yatube_cache_misses_total"),
+        )
+        with self.lock:
+            views = {name: dict(data) for name, data in self.views.items()}
+        lines = []
+        for key, metric in counters:
+            lines.append(f"# TYPE {metric} counter")
+            for view, data in sorted(views.items()):
+                lines.append(f'{metric}{{view="{view}"}} {data[key]}')
+        metric = "yatube_request_duration_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for view, data in sorted(views.items()):
+            for bound, amount in zip(BUCKETS, data["buckets"]):
+                le = "+Inf" if bound == float("inf") else bound
+                lines.append(
+                    f'{metric}_bucket{{view="{view}",le="{le}"}} {amount}'
+                )
+            lines.append(f'{metric}_sum{{view="{view}"}} {data["duration"]}')
+            lines.append(
+                f'{metric}_count{{view="{view}"}} {data["requests"]}'
+            )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unknown"
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_db_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        duration = time.perf_counter() - start
+        name = view_name(request)
+        registry.observe(name, duration, metrics)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{len(metrics.queries)} queries"',
+            f"tpl;dur={metrics.template_time * 1000:.1f}",
+            f'cache;desc="hit={metrics.cache_hits} '
+            f'miss={metrics.cache_misses}"',
+            f"total;dur={duration * 1000:.1f}",
+        ])
+        if duration * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            logger.warning(
+                "Медленный запрос %s (%s): %.0f мс, %d SQL-запросов\n%s",
+                request.path, name, duration * 1000, len(metrics.queries),
+                "\n".join(
+                    f"{query_time * 1000:.1f} мс: {sql}"
+                    for sql, query_time in metrics.queries
+                ),
+            )
+        return response
+
+
+def metrics_view(request):
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4"
+    )
@@ -0,0 +1,95 @@
+"""Чтение с реплики базы данных.
+
+GET- и HEAD-запросы читают с реплики (алиас REPLICA_DATABASE), запись
+всегда идет в основную базу. После запроса, который записал в основную
+базу (или пришел не GET-методом), клиент на REPLICA_PIN_SECONDS
+получает cookie и читает из основной базы, чтобы увидеть свои
+изменения раньше, чем их догонит реплика.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_local = threading.local()
+
+
+def _atomic_depth():
+    connection = connections[DEFAULT_DB_ALIAS]
+    return len(connection.savepoint_ids) + connection.in_atomic_block
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Разрешает читать с реплики, пока не открыта новая транзакция:
+    внутри нее читаем то, что в ней же записали."""
+    previous = getattr(_local, "replica", None)
+    _local.replica = _atomic_depth() if enabled else None
+    try:
+        yield
+    finally:
+        _local.replica = previous
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Сессия, записанная прошлым запросом, могла не дойти до реплики.
+        if model._meta.app_label == "sessions":
+            return DEFAULT_DB_ALIAS
+        alias = settings.REPLICA_DATABASE
+        depth = getattr(_local, "replica", None)
+        if (
+            depth is not None
+            and alias in connections.databases
+            and _atomic_depth() == depth
+        ):
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика — копия основной базы, связи между ними допустимы.
+        return True
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES[PIN_COOKIE]) > time.time()
+    except (KeyError, ValueError):
+        return False
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in SAFE_METHODS
+        # GET-вью тоже пишут (подписка по ссылке): следим за запросами.
+        wrote = []
+
+        def watch(execute, sql, params, many, context):
+            if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+                wrote.append(True)
+            return execute(sql, params, many, context)
+
+        with replica_reads(not writes and not is_pinned(request)), \
+                connections[DEFAULT_DB_ALIAS].execute_wrapper(watch):
+            response = self.get_response(request)
+        if writes or wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,12 @@
+"""SQLite, где транзакции сразу берут блокировку записи.
+
+При обычном BEGIN транзакция, начавшая с чтения, не может дождаться
+блокировки записи и сразу падает с "database is locked". BEGIN
+IMMEDIATE ставит писателей в очередь с ожиданием busy_timeout.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")